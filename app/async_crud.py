@@ -0,0 +1,76 @@
+"""
+Async counterparts of app.crud for request handlers.
+
+Each function runs the matching crud function through AsyncSession.run_sync,
+so queries go over the async driver (asyncpg/aiosqlite) without blocking the
+event loop, and the query logic lives in one place.
+"""
+from datetime import datetime
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import crud, schemas
+
+
+async def get_recipe(db: AsyncSession, recipe_id: int) -> Optional[dict]:
+    return await db.run_sync(crud.get_recipe, recipe_id)
+
+
+async def get_recipes_by_ids(db: AsyncSession, recipe_ids: list[int]) -> list[dict]:
+    return await db.run_sync(crud.get_recipes_by_ids, recipe_ids)
+
+
+async def get_recipe_versions(db: AsyncSession, recipe_ids: list[int]) -> list[dict]:
+    return await db.run_sync(crud.get_recipe_versions, recipe_ids)
+
+
+async def get_recipes(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[tuple[datetime, int]] = None,
+    viewer_id: Optional[int] = None,
+    **filters,
+) -> list[dict]:
+    return await db.run_sync(crud.get_recipes, skip=skip, limit=limit, cursor=cursor, viewer_id=viewer_id, **filters)
+
+
+async def get_recipes_by_user(
+    db: AsyncSession,
+    user_id: int,
+    limit: int = 100,
+    cursor: Optional[tuple[datetime, int]] = None,
+    viewer_id: Optional[int] = None,
+) -> list[dict]:
+    return await db.run_sync(crud.get_recipes_by_user, user_id, limit=limit, cursor=cursor, viewer_id=viewer_id)
+
+
+async def create_recipe(db: AsyncSession, recipe: schemas.RecipeCreate, user_id: int) -> dict:
+    return await db.run_sync(crud.create_recipe, recipe, user_id)
+
+
+async def import_recipes(db: AsyncSession, recipes: list[schemas.RecipeCreate], user_id: int) -> list[int]:
+    return await db.run_sync(crud.import_recipes, recipes, user_id)
+
+
+async def update_recipe(db: AsyncSession, recipe_id: int, updates: schemas.RecipeUpdate):
+    return await db.run_sync(crud.update_recipe, recipe_id, updates)
+
+
+async def delete_recipe(db: AsyncSession, recipe_id: int):
+    return await db.run_sync(crud.delete_recipe, recipe_id)
+
+
+async def get_recipe_nutrition(db: AsyncSession, recipe_id: int):
+    return await db.run_sync(crud.get_recipe_nutrition, recipe_id)
+
+
+async def get_recipe_ingredient_rows(db: AsyncSession, recipe_id: int):
+    return await db.run_sync(crud.get_recipe_ingredient_rows, recipe_id)
+
+
+async def save_ingredient_nutrition(db: AsyncSession, per_100g: dict[int, dict]):
+    return await db.run_sync(crud.save_ingredient_nutrition, per_100g)
+
+
+async def save_recipe_nutrition(db: AsyncSession, recipe_id: int, total_weight_g: float, totals: dict):
+    return await db.run_sync(crud.save_recipe_nutrition, recipe_id, total_weight_g, totals)
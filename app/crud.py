@@ -1,8 +1,28 @@
-from sqlalchemy.orm import Session
+from datetime import datetime, time, timezone
+from sqlalchemy import exists, func, insert, literal, or_, select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session, selectinload
 from . import models, schemas
+from .utils.images import image_srcset
+from .services import recipe_cache
 from typing import Optional
 
 
+# dialects with INSERT ... ON CONFLICT DO NOTHING RETURNING; anything else
+# falls back to a plain bulk insert plus a lookup
+_UPSERT_DIALECTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+# serialize_recipe walks recipe.ingredients and ri.ingredient.name, so read
+# paths load both up front: one extra SELECT ... IN for the whole page
+# instead of lazy loads per recipe and per ingredient.
+_ingredients_loader = selectinload(models.Recipe.ingredients).joinedload(models.RecipeIngredient.ingredient)
+
+
+# the dict is encoded to JSON as is (app.utils.responses), without a
+# second validation pass, so its keys and types must match schemas.Recipe
 def serialize_recipe(recipe: models.Recipe):
     return {
         "recipe_id": recipe.recipe_id,
@@ -14,9 +34,11 @@ def serialize_recipe(recipe: models.Recipe):
         "instructions": recipe.instructions,
         "keywords": recipe.keywords,
         "img": recipe.img,
+        "img_srcset": image_srcset(recipe.img, recipe.img_width),
         "visibility": recipe.visibility,
         "category": recipe.category,
         "created_at": recipe.created_at,
+        "updated_at": recipe.updated_at,
         "user_id": recipe.user_id,
 
         "ingredients": [
@@ -33,21 +55,155 @@ def serialize_recipe(recipe: models.Recipe):
 
 
 def get_recipe(db: Session, recipe_id: int) -> Optional[dict]:
-    recipe = db.query(models.Recipe).filter(models.Recipe.recipe_id == recipe_id).first()
+    recipe = (
+        db.query(models.Recipe)
+        .options(_ingredients_loader)
+        .filter(models.Recipe.recipe_id == recipe_id)
+        .first()
+    )
     return serialize_recipe(recipe) if recipe else None
 
 
-def get_recipes(db: Session, skip: int = 0, limit: int = 100):
+def get_recipes_by_ids(db: Session, recipe_ids: list[int]) -> list[dict]:
+    """Load many recipes in one IN query, keeping the order of recipe_ids and skipping missing ones."""
+    if not recipe_ids:
+        return []
     recipes = (
         db.query(models.Recipe)
-        .order_by(models.Recipe.created_at.desc())
-        .offset(skip)
-        .limit(limit)
+        .options(_ingredients_loader)
+        .filter(models.Recipe.recipe_id.in_(recipe_ids))
         .all()
     )
+    by_id = {r.recipe_id: r for r in recipes}
+    return [serialize_recipe(by_id[rid]) for rid in recipe_ids if rid in by_id]
+
+
+def get_recipe_versions(db: Session, recipe_ids: list[int]) -> list[dict]:
+    """recipe_id and updated_at of the recipes that still exist, from the primary key index alone."""
+    rows = db.query(models.Recipe.recipe_id, models.Recipe.updated_at).filter(models.Recipe.recipe_id.in_(recipe_ids))
+    return [{"recipe_id": recipe_id, "updated_at": updated_at} for recipe_id, updated_at in rows]
+
+
+# inlined rather than bound: Postgres only matches the partial index
+# ix_recipes_public_created_at_recipe_id when it can see the literal
+_is_public = models.Recipe.visibility == literal(
+    models.VisibilityEnum.PUBLIC, models.Recipe.visibility.type, literal_execute=True
+)
+
+
+def is_visible(visibility: models.VisibilityEnum, owner_id: int, viewer_id: Optional[int]) -> bool:
+    """Anonymous callers only see public recipes; authenticated callers also see their own."""
+    return visibility == models.VisibilityEnum.PUBLIC or (viewer_id is not None and owner_id == viewer_id)
+
+
+def _visible_to(query, viewer_id: Optional[int]):
+    if viewer_id is None:
+        return query.filter(_is_public)
+    return query.filter(or_(_is_public, models.Recipe.user_id == viewer_id))
+
+
+def _newest_first(query, cursor: Optional[tuple[datetime, int]]):
+    if cursor is not None:
+        query = query.filter(tuple_(models.Recipe.created_at, models.Recipe.recipe_id) < tuple_(*cursor))
+    return query.order_by(models.Recipe.created_at.desc(), models.Recipe.recipe_id.desc())
+
+
+def _has_ingredient(name: str):
+    return exists().where(
+        models.RecipeIngredient.recipe_id == models.Recipe.recipe_id,
+        models.RecipeIngredient.ingredient_id.in_(
+            select(models.Ingredient.ingredient_id).where(func.lower(models.Ingredient.name) == name.lower())
+        ),
+    )
+
+
+def _filtered(
+    query,
+    category: Optional[models.CategoryEnum] = None,
+    max_total_time: Optional[time] = None,
+    max_cooking_time: Optional[time] = None,
+    include_ingredients: Optional[list[str]] = None,
+    exclude_ingredients: Optional[list[str]] = None,
+    keyword: Optional[str] = None,
+):
+    if category is not None:
+        query = query.filter(models.Recipe.category == category)
+    if max_total_time is not None:
+        query = query.filter(models.Recipe.total_time <= max_total_time)
+    if max_cooking_time is not None:
+        query = query.filter(models.Recipe.cooking_time <= max_cooking_time)
+    # semi-joins, so a recipe is returned once however many ingredients match
+    for name in include_ingredients or []:
+        query = query.filter(_has_ingredient(name))
+    for name in exclude_ingredients or []:
+        query = query.filter(~_has_ingredient(name))
+    if keyword:
+        pattern = keyword.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        query = query.filter(models.Recipe.keywords.ilike(f"%{pattern}%", escape="\\"))
+    return query
+
+
+def get_recipes(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[tuple[datetime, int]] = None,
+    viewer_id: Optional[int] = None,
+    **filters,
+):
+    """
+    Newest recipes visible to viewer_id, optionally narrowed by the
+    _filtered keyword arguments (category, max_total_time,
+    max_cooking_time, include_ingredients, exclude_ingredients, keyword).
+    """
+    query = _visible_to(db.query(models.Recipe).options(_ingredients_loader), viewer_id)
+    query = _filtered(query, **filters)
+    recipes = _newest_first(query, cursor).offset(skip).limit(limit).all()
     return [serialize_recipe(r) for r in recipes]
 
 
+def resolve_ingredient_ids(db: Session, names: list[str]) -> dict[str, int]:
+    """
+    Map ingredient names to ids, inserting the missing ones, without committing.
+    One IN lookup plus at most one bulk upsert; names another transaction
+    inserted concurrently are picked up by a final lookup instead of failing
+    on the unique constraint.
+    """
+    names = list(dict.fromkeys(names))
+    if not names:
+        return {}
+
+    ids = dict(
+        db.query(models.Ingredient.name, models.Ingredient.ingredient_id)
+        .filter(models.Ingredient.name.in_(names))
+        .all()
+    )
+    missing = [name for name in names if name not in ids]
+    if not missing:
+        return ids
+
+    upsert = _UPSERT_DIALECTS.get(db.get_bind().dialect.name)
+    if upsert is not None:
+        stmt = (
+            upsert(models.Ingredient)
+            .values([{"name": name} for name in missing])
+            .on_conflict_do_nothing(index_elements=[models.Ingredient.name])
+            .returning(models.Ingredient.name, models.Ingredient.ingredient_id)
+        )
+        ids.update(db.execute(stmt).all())
+    else:
+        db.execute(insert(models.Ingredient), [{"name": name} for name in missing])
+
+    lost_race = [name for name in missing if name not in ids]
+    if lost_race:
+        ids.update(
+            db.query(models.Ingredient.name, models.Ingredient.ingredient_id)
+            .filter(models.Ingredient.name.in_(lost_race))
+            .all()
+        )
+    return ids
+
+
 def create_recipe(db: Session, recipe: schemas.RecipeCreate, user_id: int) -> dict:
     db_recipe = models.Recipe(
         recipe_name=recipe.recipe_name,
@@ -58,36 +214,74 @@ def create_recipe(db: Session, recipe: schemas.RecipeCreate, user_id: int) -> di
         instructions=recipe.instructions,
         keywords=recipe.keywords,
         img=recipe.img,
+        img_width=recipe.img_width,
         visibility=recipe.visibility,
         category=recipe.category, 
         user_id=user_id
     )
 
     db.add(db_recipe)
+    db.flush()
+
+    ingredient_ids = resolve_ingredient_ids(db, [ing.name for ing in recipe.ingredients])
+    if recipe.ingredients:
+        db.execute(
+            insert(models.RecipeIngredient),
+            [
+                {
+                    "recipe_id": db_recipe.recipe_id,
+                    "ingredient_id": ingredient_ids[ing.name],
+                    "amount": ing.amount,
+                    "unit": ing.unit,
+                }
+                for ing in recipe.ingredients
+            ],
+        )
+
+    db.add(models.SearchOutbox(recipe_id=db_recipe.recipe_id))
     db.commit()
-    db.refresh(db_recipe)
+    recipe_cache.invalidate()
+    return get_recipe(db, db_recipe.recipe_id)
 
-    for ing in recipe.ingredients:
-        db_ing = db.query(models.Ingredient).filter_by(name=ing.name).first()
 
-        if not db_ing:
-            db_ing = models.Ingredient(name=ing.name)
-            db.add(db_ing)
-            db.commit()
-            db.refresh(db_ing)
+def import_recipes(db: Session, recipes: list[schemas.RecipeCreate], user_id: int) -> list[int]:
+    """
+    Insert a batch of recipes in one transaction and return their ids in
+    order. Ingredients are upserted once for the whole batch, recipes,
+    ingredient rows and outbox entries go in as three executemany inserts,
+    and the indexer later sends the batch to Elasticsearch in bulk.
+    """
+    if not recipes:
+        return []
+    ingredient_ids = resolve_ingredient_ids(db, [ing.name for recipe in recipes for ing in recipe.ingredients])
 
-        rec_ing = models.RecipeIngredient(
-            recipe_id=db_recipe.recipe_id,
-            ingredient_id=db_ing.ingredient_id,
-            amount=ing.amount,
-            unit=ing.unit
-        )
-        db.add(rec_ing)
+    recipe_ids = db.scalars(
+        insert(models.Recipe).returning(models.Recipe.recipe_id, sort_by_parameter_order=True),
+        [
+            {
+                **recipe.model_dump(exclude={"ingredients"}),
+                "user_id": user_id,
+            }
+            for recipe in recipes
+        ],
+    ).all()
 
+    ingredient_rows = [
+        {
+            "recipe_id": recipe_id,
+            "ingredient_id": ingredient_ids[ing.name],
+            "amount": ing.amount,
+            "unit": ing.unit,
+        }
+        for recipe_id, recipe in zip(recipe_ids, recipes)
+        for ing in recipe.ingredients
+    ]
+    if ingredient_rows:
+        db.execute(insert(models.RecipeIngredient), ingredient_rows)
+    db.execute(insert(models.SearchOutbox), [{"recipe_id": recipe_id} for recipe_id in recipe_ids])
     db.commit()
-    db.refresh(db_recipe)
-
-    return serialize_recipe(db_recipe)
+    recipe_cache.invalidate()
+    return list(recipe_ids)
 
 
 def update_recipe(db: Session, recipe_id: int, updates: schemas.RecipeUpdate):
@@ -96,12 +290,17 @@ def update_recipe(db: Session, recipe_id: int, updates: schemas.RecipeUpdate):
     if not db_recipe:
         return None
 
-    update_data = updates.dict(exclude_unset=True)
+    update_data = updates.model_dump(exclude_unset=True)
 
     for field, value in update_data.items():
         setattr(db_recipe, field, value)
 
+    # lock the recipe row before taking an outbox id, so ids follow the
+    # order in which changes to one recipe commit (app.indexer versions)
+    db.flush()
+    db.add(models.SearchOutbox(recipe_id=recipe_id))
     db.commit()
+    recipe_cache.invalidate(recipe_id)
     db.refresh(db_recipe)
     return serialize_recipe(db_recipe)
 
@@ -113,14 +312,72 @@ def delete_recipe(db: Session, recipe_id: int):
         return None
 
     db.delete(db_recipe)
+    # see update_recipe
+    db.flush()
+    db.add(models.SearchOutbox(recipe_id=recipe_id))
     db.commit()
+    recipe_cache.invalidate(recipe_id)
     return True
 
-def get_recipes_by_user(db: Session, user_id: int):
-    recipes = (
+def get_recipes_by_user(
+    db: Session,
+    user_id: int,
+    limit: int = 100,
+    cursor: Optional[tuple[datetime, int]] = None,
+    viewer_id: Optional[int] = None,
+):
+    query = (
         db.query(models.Recipe)
+        .options(_ingredients_loader)
         .filter(models.Recipe.user_id == user_id)
-        .order_by(models.Recipe.created_at.desc())
+    )
+    if viewer_id != user_id:
+        query = query.filter(_is_public)
+    recipes = _newest_first(query, cursor).limit(limit).all()
+    return [serialize_recipe(r) for r in recipes]
+
+
+def get_recipe_nutrition(db: Session, recipe_id: int):
+    """
+    Return (servings, visibility, user_id, RecipeNutrition or None) for a
+    recipe in one query, or None if the recipe does not exist.
+    """
+    return (
+        db.query(
+            models.Recipe.servings,
+            models.Recipe.visibility,
+            models.Recipe.user_id,
+            models.RecipeNutrition,
+        )
+        .outerjoin(models.RecipeNutrition, models.RecipeNutrition.recipe_id == models.Recipe.recipe_id)
+        .filter(models.Recipe.recipe_id == recipe_id)
+        .first()
+    )
+
+
+def get_recipe_ingredient_rows(db: Session, recipe_id: int) -> list[models.RecipeIngredient]:
+    return (
+        db.query(models.RecipeIngredient)
+        .options(selectinload(models.RecipeIngredient.ingredient))
+        .filter(models.RecipeIngredient.recipe_id == recipe_id)
+        .order_by(models.RecipeIngredient.id)
         .all()
     )
-    return [serialize_recipe(r) for r in recipes]
\ No newline at end of file
+
+
+def save_ingredient_nutrition(db: Session, per_100g: dict[int, dict]):
+    now = datetime.now(timezone.utc)
+    for ingredient in db.query(models.Ingredient).filter(models.Ingredient.ingredient_id.in_(per_100g)):
+        ingredient.nutrition_per_100g = per_100g[ingredient.ingredient_id]
+        ingredient.nutrition_updated_at = now
+    db.commit()
+
+
+def save_recipe_nutrition(db: Session, recipe_id: int, total_weight_g: float, totals: dict) -> models.RecipeNutrition:
+    row = db.get(models.RecipeNutrition, recipe_id) or models.RecipeNutrition(recipe_id=recipe_id)
+    row.total_weight_g = total_weight_g
+    row.totals = totals
+    row.computed_at = datetime.now(timezone.utc)
+    db.add(row)
+    db.commit()
+    return row
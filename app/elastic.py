@@ -1,12 +1,25 @@
 import os
+from elastic_transport import AsyncTransport
 from elasticsearch import AsyncElasticsearch
+from .utils.timing import timed
 
 ES_HOST = os.getenv("ELASTICSEARCH_HOST", "https://quickstart-es-http:9200")
 ES_USER = os.getenv("ELASTICSEARCH_USER", "elastic")
 ES_PASS = os.getenv("ELASTICSEARCH_PASSWORD")
 
+
+
+class TimedTransport(AsyncTransport):
+    """Records every Elasticsearch round trip for per-request timings."""
+
+    async def perform_request(self, *args, **kwargs):
+        with timed("elasticsearch"):
+            return await super().perform_request(*args, **kwargs)
+
+
 client = AsyncElasticsearch(
     hosts=[ES_HOST],
     basic_auth=(ES_USER, ES_PASS),
     verify_certs=False,
-)
\ No newline at end of file
+    transport_class=TimedTransport,
+)
@@ -0,0 +1,138 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from elasticsearch.helpers import async_bulk
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from . import crud, models
+from .database import SessionLocal
+from .elastic import client
+from .search import RECIPES_INDEX, recipe_document
+from .metrics import search_outbox_pending, search_outbox_lag, num_search_index_operations
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = int(os.getenv("SEARCH_OUTBOX_BATCH_SIZE", "500"))
+POLL_INTERVAL = float(os.getenv("SEARCH_OUTBOX_POLL_INTERVAL", "1.0"))
+BASE_BACKOFF = float(os.getenv("SEARCH_OUTBOX_BASE_BACKOFF", "1.0"))
+MAX_BACKOFF = float(os.getenv("SEARCH_OUTBOX_MAX_BACKOFF", "300"))
+
+
+def _utc(value: datetime) -> datetime:
+    # SQLite hands back naive datetimes; everything stored here is UTC
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def backoff(attempts: int) -> timedelta:
+    return timedelta(seconds=min(BASE_BACKOFF * 2 ** (attempts - 1), MAX_BACKOFF))
+
+
+def _claim(db: Session, batch_size: int):
+    now = datetime.now(timezone.utc)
+    entries = (
+        db.query(models.SearchOutbox)
+        .filter(models.SearchOutbox.available_at <= now)
+        .order_by(models.SearchOutbox.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    # outbox ids grow with every change to a recipe, so the newest claimed
+    # entry versions the document; a slower worker holding an older entry
+    # can then never overwrite a newer state in the index
+    versions = {}
+    for entry in entries:
+        versions[entry.recipe_id] = max(entry.id, versions.get(entry.recipe_id, 0))
+    recipes = {r["recipe_id"]: r for r in crud.get_recipes_by_ids(db, list(versions))}
+    return entries, versions, recipes
+
+
+def _actions(versions: dict[int, int], recipes: dict):
+    for recipe_id, version in versions.items():
+        action = {"_index": RECIPES_INDEX, "_id": recipe_id, "version": version, "version_type": "external"}
+        recipe = recipes.get(recipe_id)
+        if recipe is None:
+            action["_op_type"] = "delete"
+        else:
+            action["_source"] = recipe_document(recipe)
+        yield action
+
+
+def _failed_ids(errors: list) -> set[int]:
+    failed = set()
+    for error in errors:
+        op_type, item = next(iter(error.items()))
+        #deleting a document that was never indexed is fine
+        if op_type == "delete" and item.get("status") == 404:
+            continue
+        #a newer version is already indexed
+        if item.get("status") == 409:
+            continue
+        failed.add(int(item["_id"]))
+    return failed
+
+
+def _settle(db: Session, entries, failed: set[int]):
+    now = datetime.now(timezone.utc)
+    for entry in entries:
+        if entry.recipe_id in failed:
+            entry.attempts += 1
+            entry.available_at = now + backoff(entry.attempts)
+        else:
+            db.delete(entry)
+    db.commit()
+
+
+def _record_lag(db: Session):
+    pending, oldest = db.query(func.count(models.SearchOutbox.id), func.min(models.SearchOutbox.created_at)).one()
+    search_outbox_pending.set(pending)
+    lag = (datetime.now(timezone.utc) - _utc(oldest)).total_seconds() if oldest else 0.0
+    search_outbox_lag.set(max(lag, 0.0))
+
+
+async def flush_outbox(session_factory=SessionLocal, batch_size: int = BATCH_SIZE) -> int:
+    """
+    Push one batch of pending outbox entries to Elasticsearch with a single
+    bulk request. Successful entries are removed, failed ones are retried
+    later with exponential backoff. Returns the number of entries handled.
+    """
+    db = session_factory()
+    try:
+        entries, versions, recipes = await asyncio.to_thread(_claim, db, batch_size)
+        if entries:
+            try:
+                _, errors = await async_bulk(
+                    client,
+                    _actions(versions, recipes),
+                    raise_on_error=False,
+                    raise_on_exception=False,
+                )
+                failed = _failed_ids(errors)
+            except Exception as exc:
+                logger.warning("search outbox flush failed: %s", exc)
+                failed = set(versions)
+            num_search_index_operations.labels(status="success").inc(len(versions) - len(failed))
+            num_search_index_operations.labels(status="error").inc(len(failed))
+            await asyncio.to_thread(_settle, db, entries, failed)
+        else:
+            await asyncio.to_thread(db.rollback)
+        await asyncio.to_thread(_record_lag, db)
+        return len(entries)
+    finally:
+        db.close()
+
+
+async def run_indexer(stop: asyncio.Event):
+    """Drain the search outbox until stop is set, sleeping while it is empty."""
+    while not stop.is_set():
+        try:
+            handled = await flush_outbox()
+        except Exception as exc:
+            logger.warning("search indexer error: %s", exc)
+            handled = 0
+        if handled < BATCH_SIZE:
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
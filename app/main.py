@@ -1,29 +1,55 @@
-from fastapi import FastAPI, Request
-from .metrics import (
-    num_requests,
-    num_errors,
-    request_latency,
-    requests_in_progress,
-)
+from fastapi import FastAPI
 from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
 from starlette.responses import Response
-import time
+import asyncio
+import logging
+from contextlib import asynccontextmanager
 
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from .database import Base, engine
 from .routers import recipes
 from . import models
 from app.utils.storage import MEDIA_ROOT
 import os
 from .routers import nutrition
+from .search import ensure_index
+from .indexer import run_indexer
+from .services import nutrition_client, user_client
+from .utils.images import shutdown_pool
+from .utils.media import MediaFiles
+from .middleware import MetricsMiddleware
+from .metrics import metrics_registry
+from .media_gc import MEDIA_GC_INTERVAL, run_media_gc
+
+logger = logging.getLogger(__name__)
 
 
 os.makedirs(MEDIA_ROOT, exist_ok=True)
 
 models.Base.metadata.create_all(bind=engine)
 
-app = FastAPI(title="Recipe Service")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    try:
+        await ensure_index()
+    except Exception as exc:
+        logger.warning("could not ensure Elasticsearch index: %s", exc)
+
+    stop = asyncio.Event()
+    workers = [asyncio.create_task(run_indexer(stop))]
+    if MEDIA_GC_INTERVAL > 0:
+        workers.append(asyncio.create_task(run_media_gc(stop)))
+    try:
+        yield
+    finally:
+        stop.set()
+        await asyncio.gather(*workers)
+        await user_client.http_client.aclose()
+        await nutrition_client.http_client.aclose()
+        shutdown_pool()
+
+
+app = FastAPI(title="Recipe Service", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -33,37 +59,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(MetricsMiddleware)
+
 app.include_router(recipes.router)
 app.include_router(nutrition.router)
-app.mount("/media", StaticFiles(directory=MEDIA_ROOT), name="media")
-
-@app.middleware("http")
-async def metrics_middleware(request: Request, call_next):
-    method = request.method
-    endpoint = request.url.path
-
-    requests_in_progress.inc()
-    start_time = time.time()
-
-    try:
-        response = await call_next(request)
-        status_code = response.status_code
-        duration = time.time() - start_time
-
-        num_requests.labels(method=method, endpoint=endpoint, status_code=status_code).inc()
-
-        if status_code >= 400:
-            num_errors.labels(method=method, endpoint=endpoint, status_code=status_code).inc()
-
-        request_latency.labels(method=method, endpoint=endpoint).observe(duration)
-
-        return response
-    finally:
-        requests_in_progress.dec()
+app.mount("/media", MediaFiles(directory=MEDIA_ROOT), name="media")
 
 @app.get("/metrics")
 def metrics():
-    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+    return Response(generate_latest(metrics_registry()), media_type=CONTENT_TYPE_LATEST)
  
 @app.get("/")
 def root():
@@ -0,0 +1,86 @@
+import asyncio
+import logging
+import os
+import time
+from sqlalchemy.orm import Session
+from . import models
+from .database import SessionLocal
+from .metrics import num_media_files_deleted
+from .utils import storage
+from .utils.images import ORIGINAL_NAME, VARIANT_NAME
+
+logger = logging.getLogger(__name__)
+
+MEDIA_GC_INTERVAL = float(os.getenv("MEDIA_GC_INTERVAL", "3600"))
+MEDIA_GC_GRACE_SECONDS = float(os.getenv("MEDIA_GC_GRACE_SECONDS", "3600"))
+
+
+def referenced_images(db: Session) -> set[str]:
+    return {
+        img[len("/media/"):]
+        for (img,) in db.query(models.Recipe.img).filter(models.Recipe.img.like("/media/%"))
+    }
+
+
+def _is_orphan(name: str, referenced: set[str], referenced_stems: set[str]) -> bool:
+    if name.startswith(storage.TEMP_PREFIX):
+        return True
+    if ORIGINAL_NAME.match(name):
+        return name not in referenced
+    variant = VARIANT_NAME.match(name)
+    if variant:
+        return variant.group(1) not in referenced_stems
+    return False
+
+
+def sweep_orphans(db: Session, backend=None, grace_seconds: float = MEDIA_GC_GRACE_SECONDS, now: float | None = None) -> list[str]:
+    """
+    Delete media no recipe points at any more: originals replaced by
+    update_recipe or left by deleted recipes, their derivatives, and
+    abandoned partial uploads. Files modified within grace_seconds are kept,
+    which covers uploads whose recipe is not committed yet and files that a
+    deduplicated upload has just reused. The age is checked again as each
+    file is deleted, since an upload can reuse it after the listing.
+    """
+    backend = backend or storage.storage_backend
+    now = now or time.time()
+    cutoff = now - grace_seconds
+    files = [(name, modified) for name, modified in backend.list() if modified < cutoff]
+    referenced = referenced_images(db)
+    referenced_stems = {os.path.splitext(name)[0] for name in referenced}
+
+    removed = []
+    for name, _ in files:
+        if _is_orphan(name, referenced, referenced_stems) and backend.delete_if_stale(name, cutoff):
+            removed.append(name)
+    num_media_files_deleted.inc(len(removed))
+    return removed
+
+
+def _sweep_once() -> list[str]:
+    db = SessionLocal()
+    try:
+        return sweep_orphans(db)
+    finally:
+        db.close()
+
+
+async def run_media_gc(stop: asyncio.Event):
+    """Sweep orphaned media every MEDIA_GC_INTERVAL seconds until stop is set."""
+    while not stop.is_set():
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=MEDIA_GC_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+        if stop.is_set():
+            break
+        try:
+            removed = await asyncio.to_thread(_sweep_once)
+            if removed:
+                logger.info("media gc removed %d files", len(removed))
+        except Exception as exc:
+            logger.warning("media gc failed: %s", exc)
+
+
+if __name__ == "__main__":
+    print(f"removed {len(_sweep_once())} orphaned media files")
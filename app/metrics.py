@@ -1,8 +1,37 @@
-from prometheus_client import Counter, Histogram, Gauge
+import os
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Histogram, Gauge, multiprocess
 
 num_requests = Counter("http_requests_total", "Total number of HTTP requests", ["method", "endpoint", "status_code"])
 num_errors = Counter("http_request_errors_total", "Total number of HTTP request errors", ["method", "endpoint", "status_code"])
 num_created_recipes = Counter("created_recipes_total", "Total number of created recipes",  ["source"])
 request_latency = Histogram("http_request_latency_seconds", "HTTP request latency in seconds",  ["method", "endpoint"])
-requests_in_progress = Gauge("http_requests_in_progress", "Number of HTTP requests in progress")
-num_nutrition_analyses = Counter("nutrition_analyses_total","Total number of nutrition analyses",["source", "status"])
\ No newline at end of file
+requests_in_progress = Gauge("http_requests_in_progress", "Number of HTTP requests in progress", multiprocess_mode="livesum")
+num_nutrition_analyses = Counter("nutrition_analyses_total","Total number of nutrition analyses",["source", "status"])
+# every worker runs an indexer that measures the same table: report the latest reading
+search_outbox_pending = Gauge("search_outbox_pending", "Number of recipes waiting to be written to Elasticsearch", multiprocess_mode="livemostrecent")
+search_outbox_lag = Gauge("search_outbox_lag_seconds", "Age of the oldest recipe change not yet written to Elasticsearch", multiprocess_mode="livemostrecent")
+num_search_index_operations = Counter("search_index_operations_total", "Total number of search index writes", ["status"])
+cache_hits = Counter("cache_hits_total", "Total number of cache hits", ["cache"])
+cache_misses = Counter("cache_misses_total", "Total number of cache misses", ["cache"])
+cache_evictions = Counter("cache_evictions_total", "Total number of entries evicted from in-process caches", ["cache"])
+dependency_time = Histogram("http_request_dependency_seconds", "Time one request spent in each dependency", ["dependency", "endpoint"])
+dependency_calls = Histogram(
+    "http_request_dependency_calls",
+    "Calls one request made to each dependency",
+    ["dependency", "endpoint"],
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200),
+)
+num_media_files_deleted = Counter("media_files_deleted_total", "Total number of orphaned media files removed")
+
+
+def metrics_registry():
+    """
+    The registry /metrics exposes. With several workers
+    (PROMETHEUS_MULTIPROC_DIR set) every worker writes its samples to that
+    directory and a scrape aggregates all of them, whichever worker serves it.
+    """
+    if not os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
@@ -0,0 +1,73 @@
+import os
+import time
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from .metrics import num_requests, num_errors, request_latency, requests_in_progress, dependency_time, dependency_calls
+from .utils import timing
+
+EXCLUDED_PATHS = {"/metrics", "/health"}
+# adds a Server-Timing header with the per-dependency breakdown
+DEBUG = os.getenv("DEBUG", "false").lower() in {"1", "true", "yes"}
+UNMATCHED = "<unmatched>"
+
+
+def route_template(scope: Scope, root_path: str) -> str:
+    """
+    The matched route's path template, e.g. /recipes/{recipe_id}, so every
+    recipe id shares one time series. Routing leaves the route in the scope;
+    mounted apps like /media only leave their prefix in root_path.
+    """
+    route = scope.get("route")
+    if route is not None:
+        return getattr(route, "path", UNMATCHED)
+    mount = scope.get("root_path", root_path)[len(root_path):]
+    if mount:
+        return f"{mount}/{{path}}"
+    return UNMATCHED
+
+
+class MetricsMiddleware:
+    """
+    Request count, error count, latency, in-flight gauge and time per
+    dependency, as plain ASGI middleware: unlike @app.middleware("http") it
+    adds no task or body stream per request.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"] in EXCLUDED_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        root_path = scope.get("root_path", "")
+        status_code = 500
+        timings = {}
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if DEBUG:
+                    header = timing.server_timing(timings, time.perf_counter() - start_time)
+                    message = {**message, "headers": [*message.get("headers", []), (b"server-timing", header.encode())]}
+            await send(message)
+
+        requests_in_progress.inc()
+        start_time = time.perf_counter()
+        try:
+            with timing.collect() as timings:
+                await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start_time
+            requests_in_progress.dec()
+
+            method = scope["method"]
+            endpoint = route_template(scope, root_path)
+            num_requests.labels(method=method, endpoint=endpoint, status_code=status_code).inc()
+            if status_code >= 400:
+                num_errors.labels(method=method, endpoint=endpoint, status_code=status_code).inc()
+            request_latency.labels(method=method, endpoint=endpoint).observe(duration)
+            for dependency, (calls, seconds) in timings.items():
+                dependency_time.labels(dependency=dependency, endpoint=endpoint).observe(seconds)
+                dependency_calls.labels(dependency=dependency, endpoint=endpoint).observe(calls)
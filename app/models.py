@@ -1,8 +1,9 @@
-from sqlalchemy import Column, Integer, String, Text, Time, TIMESTAMP, Enum as SQLEnum, Float, ForeignKey
+from sqlalchemy import Column, Index, Integer, String, Text, Time, TIMESTAMP, Enum as SQLEnum, Float, ForeignKey, JSON
 from .database import Base
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from enum import Enum
+from datetime import datetime, timezone
 
 class CategoryEnum(str, Enum):
     BREAKFAST = "breakfast"
@@ -29,20 +30,57 @@ class Recipe(Base):
     instructions = Column(Text, nullable=False)
     keywords = Column(String, nullable=True)
     img = Column(String, nullable=False)
+    # width of the original upload in pixels, which decides the srcset;
+    # None when unknown, e.g. for imported image paths
+    img_width = Column(Integer, nullable=True)
     visibility = Column(SQLEnum(VisibilityEnum), default=VisibilityEnum.PUBLIC, nullable=False)
     category = Column(SQLEnum(CategoryEnum), nullable=False)
-    created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
+    # also set client-side so every row carries microsecond precision; keyset
+    # cursors compare on it exactly and SQLite's CURRENT_TIMESTAMP stores
+    # whole seconds in a different text format than bound datetimes
+    created_at = Column(TIMESTAMP(timezone=True), default=lambda: datetime.now(timezone.utc), server_default=func.now())
+    # drives the ETag of GET /recipes/{id}
+    updated_at = Column(
+        TIMESTAMP(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+        server_default=func.now(),
+        nullable=False,
+    )
     
-    ingredients = relationship("RecipeIngredient", back_populates="recipe", cascade="all, delete-orphan")
+    ingredients = relationship("RecipeIngredient", back_populates="recipe", cascade="all, delete-orphan", order_by="RecipeIngredient.id")
+    nutrition = relationship("RecipeNutrition", uselist=False, cascade="all, delete-orphan")
+
+    # keyset pagination walks (created_at, recipe_id) newest first; the
+    # anonymous feed only ever reads public rows, so it gets a partial index
+    __table_args__ = (
+        Index("ix_recipes_created_at_recipe_id", "created_at", "recipe_id"),
+        Index("ix_recipes_user_id_created_at_recipe_id", "user_id", "created_at", "recipe_id"),
+        Index(
+            "ix_recipes_public_created_at_recipe_id",
+            "created_at",
+            "recipe_id",
+            postgresql_where=(visibility == VisibilityEnum.PUBLIC),
+            sqlite_where=(visibility == VisibilityEnum.PUBLIC),
+        ),
+        # GET /recipes/?category=... walks one category newest first
+        Index("ix_recipes_category_created_at_recipe_id", "category", "created_at", "recipe_id"),
+    )
 
 class Ingredient(Base):
     __tablename__ = "ingredients"
 
     ingredient_id = Column(Integer, primary_key=True)
     name = Column(String, unique=True, nullable=False)
+    # app.nutrition.NUTRIENTS per 100 g, filled lazily from api-ninjas
+    nutrition_per_100g = Column(JSON, nullable=True)
+    nutrition_updated_at = Column(TIMESTAMP(timezone=True), nullable=True)
 
     uses = relationship("RecipeIngredient", back_populates="ingredient")
 
+    # ingredient filters match names case-insensitively
+    __table_args__ = (Index("ix_ingredients_name_lower", func.lower(name)),)
+
 class RecipeIngredient(Base):
     __tablename__ = "recipe_ingredients"
 
@@ -53,3 +91,39 @@ class RecipeIngredient(Base):
     unit = Column(String, nullable=False)
     recipe = relationship("Recipe", back_populates="ingredients")
     ingredient = relationship("Ingredient", back_populates="uses")
+
+    # ingredient filters look up recipes by ingredient
+    __table_args__ = (Index("ix_recipe_ingredients_ingredient_id_recipe_id", "ingredient_id", "recipe_id"),)
+
+
+class RecipeNutrition(Base):
+    """
+    Materialised nutrition totals for a recipe. Per-100g and per-serving
+    values are derived on read, so only a change to the recipe's ingredients
+    invalidates the row.
+    """
+    __tablename__ = "recipe_nutrition"
+
+    recipe_id = Column(Integer, ForeignKey("recipes.recipe_id", ondelete="CASCADE"), primary_key=True)
+    total_weight_g = Column(Float, nullable=False)
+    totals = Column(JSON, nullable=False)
+    computed_at = Column(TIMESTAMP(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False)
+
+
+class SearchOutbox(Base):
+    """
+    Recipes whose search document is stale. Written in the same transaction
+    as the recipe change and drained by app.indexer, which indexes the
+    recipe's current state, or deletes the document if the recipe is gone.
+    """
+    __tablename__ = "search_outbox"
+
+    id = Column(Integer, primary_key=True)
+    recipe_id = Column(Integer, nullable=False)
+    created_at = Column(TIMESTAMP(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False)
+    available_at = Column(TIMESTAMP(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+
+    __table_args__ = (
+        Index("ix_search_outbox_available_at", "available_at", "id"),
+    )
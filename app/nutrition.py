@@ -0,0 +1,170 @@
+from typing import Optional
+import numpy as np
+
+NUTRIENTS = [
+    "fat_total_g",
+    "fat_saturated_g",
+    "sodium_mg",
+    "potassium_mg",
+    "cholesterol_mg",
+    "carbohydrates_total_g",
+    "fiber_g",
+    "sugar_g",
+]
+
+MASS_UNITS_G = {
+    "mg": 0.001,
+    "g": 1.0, "gram": 1.0, "grams": 1.0,
+    "kg": 1000.0,
+    "oz": 28.3495, "ounce": 28.3495, "ounces": 28.3495,
+    "lb": 453.592, "lbs": 453.592, "pound": 453.592, "pounds": 453.592,
+}
+
+VOLUME_UNITS_ML = {
+    "ml": 1.0, "milliliter": 1.0, "milliliters": 1.0,
+    "cl": 10.0,
+    "dl": 100.0,
+    "l": 1000.0, "liter": 1000.0, "liters": 1000.0,
+    "tsp": 4.92892, "teaspoon": 4.92892, "teaspoons": 4.92892,
+    "tbsp": 14.7868, "tablespoon": 14.7868, "tablespoons": 14.7868,
+    "fl oz": 29.5735,
+    "cup": 236.588, "cups": 236.588,
+}
+
+# g/ml for common pantry items measured by volume; anything else counts as water
+DENSITIES = {
+    "flour": 0.53,
+    "sugar": 0.85,
+    "brown sugar": 0.93,
+    "powdered sugar": 0.56,
+    "salt": 1.2,
+    "rice": 0.85,
+    "oats": 0.41,
+    "butter": 0.96,
+    "oil": 0.92,
+    "olive oil": 0.91,
+    "honey": 1.42,
+    "milk": 1.03,
+    "cream": 1.0,
+    "yogurt": 1.03,
+    "cocoa": 0.42,
+}
+
+
+def convert_to_num(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def density(name: str) -> float:
+    name = name.lower().strip()
+    if name in DENSITIES:
+        return DENSITIES[name]
+    # "plain flour", "sunflower oil": fall back to the last word
+    return DENSITIES.get(name.rsplit(" ", 1)[-1], 1.0)
+
+
+def to_grams(amount: float, unit: str, name: str) -> Optional[float]:
+    """
+    Convert a recipe amount to grams. Returns None for units with no fixed
+    weight (pieces, pinches, cloves...), which callers resolve another way.
+    """
+    unit = " ".join(unit.lower().replace(".", "").split())
+    if unit in MASS_UNITS_G:
+        return amount * MASS_UNITS_G[unit]
+    if unit in VOLUME_UNITS_ML:
+        return amount * VOLUME_UNITS_ML[unit] * density(name)
+    return None
+
+
+def per_100g_from_items(items: list[dict]) -> dict:
+    """Normalise api-ninjas items for one ingredient to values per 100 g."""
+    weight = sum(convert_to_num(item.get("serving_size_g")) for item in items)
+    if weight <= 0:
+        return {field: 0.0 for field in NUTRIENTS}
+    return {
+        field: sum(convert_to_num(item.get(field)) for item in items) * 100.0 / weight
+        for field in NUTRIENTS
+    }
+
+
+def summarize(totals: dict, total_weight_g: float, servings: int) -> dict:
+    per_100g = {}
+    if total_weight_g > 0:
+        factor = 100.0 / total_weight_g
+        per_100g = {field: value * factor for field, value in totals.items()}
+
+    per_serving = {}
+    if total_weight_g > 0 and servings > 0:
+        factor = 1.0 / servings
+        per_serving = {field: value * factor for field, value in totals.items()}
+
+    return {
+        "total_weight_g": total_weight_g,
+        "totals": totals,
+        "per_100g": per_100g,
+        "per_serving": per_serving,
+    }
+
+
+def aggregate_items(items: list[dict]) -> tuple[dict, float]:
+    """Sum api-ninjas items one by one into (totals, total_weight_g)."""
+    total_weight_g = 0.0
+    totals = {field: 0.0 for field in NUTRIENTS}
+    for item in items:
+        total_weight_g += convert_to_num(item.get("serving_size_g"))
+        for field in NUTRIENTS:
+            totals[field] += convert_to_num(item.get(field))
+    return totals, total_weight_g
+
+
+def nutrient_vector(items: list[dict]) -> list[float]:
+    """[weight_g, *NUTRIENTS] summed over the items returned for one query."""
+    totals, total_weight_g = aggregate_items(items)
+    return [total_weight_g, *(totals[field] for field in NUTRIENTS)]
+
+
+def aggregate_batch(
+    query_vectors: np.ndarray,
+    ingredient_queries: np.ndarray,
+    recipe_offsets: np.ndarray,
+    servings: np.ndarray,
+) -> list[dict]:
+    """
+    Nutrition summaries for many recipes in one pass.
+
+    query_vectors is (queries x [weight, *NUTRIENTS]) for every distinct
+    query, ingredient_queries maps each ingredient (grouped by recipe) to its
+    row, and recipe i owns ingredients recipe_offsets[i]:recipe_offsets[i+1].
+    Per-recipe segment sums are one weighted bincount per column, so the
+    Python work is per column and per recipe, never per ingredient.
+    """
+    matrix = query_vectors[ingredient_queries]
+    n_recipes = len(recipe_offsets) - 1
+    recipe_ids = np.repeat(np.arange(n_recipes), np.diff(recipe_offsets))
+    sums = np.column_stack([
+        np.bincount(recipe_ids, weights=matrix[:, col], minlength=n_recipes)
+        for col in range(query_vectors.shape[1])
+    ])
+
+    weights = sums[:, 0]
+    totals = sums[:, 1:]
+    has_weight = weights > 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        per_100g = totals * (100.0 / weights)[:, None]
+        per_serving = totals / servings[:, None]
+
+    summaries = []
+    for weight, total, p100, pserv, weighed, portions in zip(
+        weights.tolist(), totals.tolist(), per_100g.tolist(), per_serving.tolist(),
+        has_weight.tolist(), servings.tolist(),
+    ):
+        summaries.append({
+            "total_weight_g": weight,
+            "totals": dict(zip(NUTRIENTS, total)),
+            "per_100g": dict(zip(NUTRIENTS, p100)) if weighed else {},
+            "per_serving": dict(zip(NUTRIENTS, pserv)) if weighed and portions > 0 else {},
+        })
+    return summaries
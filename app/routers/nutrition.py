@@ -1,8 +1,10 @@
+import numpy as np
 from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List
-from app.services.nutrition_client import fetch_nutrition
+from app.services.nutrition_client import fetch_nutrition_many
 from ..metrics import num_nutrition_analyses
+from ..nutrition import NUTRIENTS as nutrition_data, aggregate_batch, aggregate_items, nutrient_vector, summarize
 
 router = APIRouter(prefix="/nutrition", tags=["nutrition"])
 
@@ -14,67 +16,55 @@ class Ingredient(BaseModel):
 class NutritionSummaryRequest(BaseModel):
     ingredients: List[Ingredient]
 
-nutrition_data = [
-    "fat_total_g",
-    "fat_saturated_g",
-    "sodium_mg",
-    "potassium_mg",
-    "cholesterol_mg",
-    "carbohydrates_total_g",
-    "fiber_g",
-    "sugar_g",
-]
-
-def convert_to_num(value):
-    try:
-        return float(value)
-    except (TypeError, ValueError):
-        return 0.0
+class BatchRecipe(BaseModel):
+    ingredients: List[Ingredient]
+    servings: int
+
+class NutritionBatchRequest(BaseModel):
+    recipes: List[BatchRecipe] = Field(..., max_length=1000)
+
+
+def ingredient_query(ingredient: Ingredient) -> str:
+    return f"{ingredient.amount:g}{(' ' + ingredient.unit) if ingredient.unit else ''} {ingredient.name}"
+
 
 @router.post("")
 async def get_nutrition_summary(data: NutritionSummaryRequest, servings: int):
     status = "success"
     try:
-        items = []
-
-        for ingredient in data.ingredients:
-            query = f"{ingredient.amount}{(' ' + ingredient.unit) if ingredient.unit else ''} {ingredient.name}"
-            res = await fetch_nutrition(query)
-            items.extend(res)
-
-        total_weight_g = 0.0
-        totals = {field: 0.0 for field in nutrition_data}
-
-        for item in items:
-            weight = convert_to_num(item.get("serving_size_g"))
-            total_weight_g += weight
-            for field in nutrition_data:
-                totals[field] += convert_to_num(item.get(field))
-
-        per_100g = {}
-        if total_weight_g > 0:
-            factor = 100.0 / total_weight_g
-            for field, value in totals.items():
-                per_100g[field] = value * factor
-        
-        per_serving = {}
-        if total_weight_g > 0 and servings > 0:
-            factor = 1.0 / servings
-            for field, value in totals.items():
-                per_serving[field] = value * factor
-        
-
-        return {
-            "total_weight_g": total_weight_g,
-            "totals": totals,
-            "per_100g": per_100g,
-            "per_serving": per_serving,
-            "items": items,
-        }
+        queries = [ingredient_query(ingredient) for ingredient in data.ingredients]
+        items = [item for res in await fetch_nutrition_many(queries) for item in res]
+        totals, total_weight_g = aggregate_items(items)
+        return {**summarize(totals, total_weight_g, servings), "items": items}
 
     except Exception as e:
         status = "error"
         raise HTTPException(status_code=502, detail=str(e))
     
     finally:
-        num_nutrition_analyses.labels(source="external_api", status=status).inc()
\ No newline at end of file
+        num_nutrition_analyses.labels(source="external_api", status=status).inc()
+
+
+@router.post("/batch")
+async def get_nutrition_batch(data: NutritionBatchRequest):
+    status = "success"
+    try:
+        queries = [ingredient_query(i) for recipe in data.recipes for i in recipe.ingredients]
+        positions = {query: pos for pos, query in enumerate(dict.fromkeys(queries))}
+        results = await fetch_nutrition_many(list(positions))
+
+        query_vectors = np.array(
+            [nutrient_vector(items) for items in results], dtype=float
+        ).reshape(len(results), len(nutrition_data) + 1)
+        ingredient_queries = np.fromiter((positions[q] for q in queries), dtype=np.intp, count=len(queries))
+        recipe_offsets = np.cumsum([0] + [len(recipe.ingredients) for recipe in data.recipes])
+        servings = np.array([recipe.servings for recipe in data.recipes], dtype=float)
+
+        return {"recipes": aggregate_batch(query_vectors, ingredient_queries, recipe_offsets, servings)}
+
+    except Exception as e:
+        status = "error"
+        raise HTTPException(status_code=502, detail=str(e))
+
+    finally:
+        num_nutrition_analyses.labels(source="external_api_batch", status=status).inc()
@@ -1,93 +1,272 @@
 import json
+import os
 from datetime import time
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
-from sqlalchemy.orm import Session
+from elasticsearch import ApiError, TransportError
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, Response, status, UploadFile, File, Form
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import ValidationError
-from ..database import SessionLocal
+from ..database import AsyncSessionLocal
 from .. import schemas
-from .. import crud
+from .. import async_crud as crud
+from ..crud import is_visible
 from .. import models
 from ..elastic import client
-from ..utils.auth import get_current_user_id
+from ..utils.auth import get_current_user_id, get_optional_user_id
 from ..services.user_client import get_user_id_by_username
 from ..utils.storage import save_image
-from ..metrics import num_created_recipes
+from ..utils.images import create_derivatives, stored_image_width
+from ..utils.responses import RecipeJSONResponse, dumps
+from ..utils.pagination import encode_cursor, decode_cursor, encode_search_after, decode_search_after
+from ..search import RECIPES_INDEX, build_search
+from ..metrics import num_created_recipes, num_nutrition_analyses
+from ..nutrition import summarize
+from ..services.recipe_nutrition import compute_recipe_nutrition
+from ..services import recipe_cache
 
 router = APIRouter(prefix="/recipes", tags=["Recipes"])
 
-def get_db():
-    db = SessionLocal()
-    try:
+MAX_PAGE_SIZE = 100
+MAX_BATCH_SIZE = 100
+IMPORT_BATCH_SIZE = int(os.getenv("RECIPE_IMPORT_BATCH_SIZE", "500"))
+MAX_IMPORT_LINE_BYTES = 1024 * 1024
+MAX_IMPORT_ERRORS = 1000
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
-
-
-#adding and updating recipe to elasticsearch
-async def index_recipe(recipe):
-    await client.index(
-        index="recipes",
-        id=recipe["recipe_id"],
-        document={
-            "recipe_name": recipe["recipe_name"],
-            "recipe_id": recipe["recipe_id"],
-            "user_id": recipe["user_id"],
-            "description": recipe["description"],
-            "ingredients": [r["name"] for r in recipe["ingredients"]],
-            "cooking_time": recipe["cooking_time"].strftime("%H:%M:%S"),
-            "total_time": recipe["total_time"].strftime("%H:%M:%S"),
-            "keywords": recipe["keywords"],
-            "category": recipe["category"].value,
-            "visibility": recipe["visibility"].value,
-            "created_at": recipe["created_at"].isoformat(),
-        }
-    )
 
-async def update_recipe_es(recipe):
-    await client.update(
-        index="recipes",
-        id=recipe["recipe_id"],
-        doc={
-            "recipe_name": recipe["recipe_name"],
-            "recipe_id": recipe["recipe_id"],
-            "user_id": recipe["user_id"],
-            "description": recipe["description"],
-            "ingredients": [r["name"] for r in recipe["ingredients"]],
-            "cooking_time": recipe["cooking_time"].strftime("%H:%M:%S"),
-            "total_time": recipe["total_time"].strftime("%H:%M:%S"),
-            "keywords": recipe["keywords"],
-            "category": recipe["category"].value,
-            "visibility": recipe["visibility"].value,
-            "created_at": recipe["created_at"].isoformat(),
-        }
-    )
-#deleting recipe from elasticsearch
-async def delete_recipe_es(recipe_id):
-    await client.delete(
-        index="recipes",
-        id=recipe_id,
-        ignore=[404]
-    )
+
+def parse_cursor(cursor: str | None):
+    if cursor is None:
+        return None
+    try:
+        return decode_cursor(cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+#a full page means there may be more; hand out a cursor past its last row
+def next_cursor(recipes: list[dict], limit: int) -> str | None:
+    if recipes and len(recipes) == limit:
+        last = recipes[-1]
+        return encode_cursor(last["created_at"], last["recipe_id"])
+    return None
+
+
+def set_next_cursor(response: Response, recipes: list[dict], limit: int):
+    cursor = next_cursor(recipes, limit)
+    if cursor:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
+
+
+#other workers keep their own caches, so a hit is checked against the rows'
+#updated_at first; entries for recipes changed or deleted since come back None
+async def drop_stale(db: AsyncSession, payloads: list) -> list:
+    recipe_ids = list({rid for p in payloads if p is not None for rid, _ in p.versions})
+    if not recipe_ids:
+        return payloads
+    current = {r["recipe_id"]: recipe_cache.recipe_etag(r) for r in await crud.get_recipe_versions(db, recipe_ids)}
+    return [p if p is not None and recipe_cache.is_current(p, current) else None for p in payloads]
+
+
+#serve a cached payload, or an empty 304 if the client already has it
+def cached_response(request: Request, payload: recipe_cache.Payload) -> Response:
+    headers = {"ETag": payload.etag}
+    if payload.next_cursor:
+        headers[NEXT_CURSOR_HEADER] = payload.next_cursor
+    if recipe_cache.etag_matches(request.headers.get("if-none-match"), payload.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=payload.body, media_type="application/json", headers=headers)
+
 
 @router.get("/", response_model=list[schemas.Recipe])
-def read_recipes(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    recipes = crud.get_recipes(db, skip=skip, limit=limit)
-    return recipes 
+async def read_recipes(
+    request: Request,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    category: schemas.CategoryEnum | None = None,
+    max_total_time: time | None = None,
+    max_cooking_time: time | None = None,
+    ingredient: list[str] = Query([], description="Ingredients the recipe must contain"),
+    exclude_ingredient: list[str] = Query([], description="Ingredients the recipe must not contain"),
+    keyword: str | None = Query(None, min_length=1, max_length=100),
+    user_id: int | None = Depends(get_optional_user_id),
+    db: AsyncSession = Depends(get_db),
+):
+    if cursor is not None and skip:
+        raise HTTPException(status_code=400, detail="skip cannot be combined with cursor")
+    page_cursor = parse_cursor(cursor)
+
+    #pages include the viewer's own private recipes, so cache them per viewer
+    key = f"{user_id}:{sorted(request.query_params.multi_items())}"
+    (payload,) = await drop_stale(db, [recipe_cache.pages.get(key)])
+    if payload is None:
+        recipes = await crud.get_recipes(
+            db,
+            skip=skip,
+            limit=limit,
+            cursor=page_cursor,
+            viewer_id=user_id,
+            category=category,
+            max_total_time=max_total_time,
+            max_cooking_time=max_cooking_time,
+            include_ingredients=ingredient,
+            exclude_ingredients=exclude_ingredient,
+            keyword=keyword,
+        )
+        payload = recipe_cache.page_payload(recipes, next_cursor(recipes, limit))
+        recipe_cache.pages.set(key, payload)
+    return cached_response(request, payload)
+
+
+@router.get("/search", response_model=list[schemas.Recipe])
+async def search_recipes(
+    q: str | None = None,
+    category: schemas.CategoryEnum | None = None,
+    max_total_time: time | None = None,
+    ingredient: list[str] = Query([], description="Ingredients the recipe must contain"),
+    exclude_ingredient: list[str] = Query([], description="Ingredients the recipe must not contain"),
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    user_id: int | None = Depends(get_optional_user_id),
+    db: AsyncSession = Depends(get_db),
+):
+    search_after = None
+    if cursor is not None:
+        try:
+            search_after = decode_search_after(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    query, sort = build_search(
+        q=q,
+        category=category.value if category else None,
+        max_total_time=max_total_time.strftime("%H:%M:%S") if max_total_time else None,
+        include_ingredients=ingredient,
+        exclude_ingredients=exclude_ingredient,
+        viewer_id=user_id,
+    )
+    try:
+        resp = await client.search(
+            index=RECIPES_INDEX,
+            query=query,
+            sort=sort,
+            size=limit,
+            search_after=search_after,
+            source=False,
+            track_total_hits=False,
+        )
+    except TransportError:
+        raise HTTPException(status_code=503, detail="Search is unavailable")
+    except ApiError as e:
+        raise HTTPException(status_code=502, detail=f"Search failed: {e.message}")
+    hits = resp["hits"]["hits"]
+
+    recipes = await crud.get_recipes_by_ids(db, [int(hit["_id"]) for hit in hits])
+    #the index can lag behind Postgres, so recheck visibility on the fresh rows
+    visible = [r for r in recipes if is_visible(r["visibility"], r["user_id"], user_id)]
+    response = RecipeJSONResponse(visible)
+    if len(hits) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_search_after(hits[-1]["sort"])
+    return response
+
+
+def parse_ids(ids: str) -> list[int]:
+    try:
+        recipe_ids = [int(part) for part in ids.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be a comma-separated list of integers")
+    recipe_ids = list(dict.fromkeys(recipe_ids))
+    if not recipe_ids:
+        raise HTTPException(status_code=400, detail="ids must not be empty")
+    if len(recipe_ids) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_SIZE} ids per request")
+    return recipe_ids
+
+
+#one IN query for the ids not cached yet; bodies come from the same cache as read_recipe
+@router.get("/batch", response_model=schemas.RecipeBatch)
+async def read_recipes_batch(
+    ids: str = Query(..., description="Comma-separated recipe ids, e.g. 3,1,2"),
+    user_id: int | None = Depends(get_optional_user_id),
+    db: AsyncSession = Depends(get_db),
+):
+    recipe_ids = parse_ids(ids)
+    cached = await drop_stale(db, [recipe_cache.recipes.get(str(rid)) for rid in recipe_ids])
+    payloads = dict(zip(recipe_ids, cached))
+
+    uncached = [rid for rid, payload in payloads.items() if payload is None]
+    for recipe in await crud.get_recipes_by_ids(db, uncached):
+        payload = recipe_cache.recipe_payload(recipe)
+        recipe_cache.recipes.set(str(recipe["recipe_id"]), payload)
+        payloads[recipe["recipe_id"]] = payload
+
+    #recipes the caller may not see are reported like ones that do not exist
+    for rid, payload in payloads.items():
+        if payload is not None and not is_visible(payload.visibility, payload.user_id, user_id):
+            payloads[rid] = None
+
+    found = [payloads[rid].body for rid in recipe_ids if payloads[rid] is not None]
+    missing = [rid for rid in recipe_ids if payloads[rid] is None]
+    body = b'{"recipes":[' + b",".join(found) + b'],"missing":' + dumps(missing) + b"}"
+    return Response(content=body, media_type="application/json")
 
 
 @router.get("/{recipe_id}", response_model=schemas.Recipe)
-def read_recipe(recipe_id: int, db: Session = Depends(get_db)):
-    recipe = crud.get_recipe(db, recipe_id)
+async def read_recipe(
+    recipe_id: int,
+    request: Request,
+    user_id: int | None = Depends(get_optional_user_id),
+    db: AsyncSession = Depends(get_db),
+):
+    (payload,) = await drop_stale(db, [recipe_cache.recipes.get(str(recipe_id))])
+    if payload is None:
+        recipe = await crud.get_recipe(db, recipe_id)
 
-    if not recipe:
+        if not recipe:
+            recipe_cache.recipes.delete(str(recipe_id))
+            raise HTTPException(status_code=404, detail="Recipe not found")
+
+        payload = recipe_cache.recipe_payload(recipe)
+        recipe_cache.recipes.set(str(recipe_id), payload)
+
+    #404 rather than 403, so private recipe ids are not confirmed to exist
+    if not is_visible(payload.visibility, payload.user_id, user_id):
+        raise HTTPException(status_code=404, detail="Recipe not found")
+    return cached_response(request, payload)
+
+
+
+@router.get("/{recipe_id}/nutrition")
+async def read_recipe_nutrition(
+    recipe_id: int,
+    user_id: int | None = Depends(get_optional_user_id),
+    db: AsyncSession = Depends(get_db),
+):
+    row = await crud.get_recipe_nutrition(db, recipe_id)
+    #same rule as read_recipe, so private ids are not confirmed here either
+    if row is None or not is_visible(row.visibility, row.user_id, user_id):
         raise HTTPException(status_code=404, detail="Recipe not found")
 
-    return recipe  
+    servings, _, _, stored = row
+    if stored is not None:
+        num_nutrition_analyses.labels(source="database", status="success").inc()
+        return summarize(stored.totals, stored.total_weight_g, servings)
 
+    try:
+        summary = await compute_recipe_nutrition(db, recipe_id, servings)
+    except Exception as e:
+        num_nutrition_analyses.labels(source="external_api", status="error").inc()
+        raise HTTPException(status_code=502, detail=str(e))
+    num_nutrition_analyses.labels(source="external_api", status="success").inc()
+    return summary
 
 
 @router.post("/", response_model=schemas.Recipe, status_code=201)
 async def create_recipe(
+    background_tasks: BackgroundTasks,
     recipe_name: str = Form(...),
     description: str | None = Form(None),
     cooking_time: time = Form(...),
@@ -100,7 +279,7 @@ async def create_recipe(
     category: schemas.CategoryEnum = Form(...),
     image: UploadFile = File(...),
     user_id: int = Depends(get_current_user_id),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     try:
         ingredients_payload = json.loads(ingredients)
@@ -108,10 +287,9 @@ async def create_recipe(
     except (json.JSONDecodeError, TypeError, ValidationError):
         raise HTTPException(status_code=400, detail="Invalid ingredients format")
 
-    if image.content_type not in {"image/jpeg", "image/png", "image/webp"}:
-        raise HTTPException(status_code=400, detail="Unsupported image type")
-
     image_path = await save_image(image)
+    image_width = await stored_image_width(image_path)
+    background_tasks.add_task(create_derivatives, image_path)
 
     recipe = schemas.RecipeCreate(
         recipe_name=recipe_name,
@@ -123,19 +301,82 @@ async def create_recipe(
         instructions=instructions,
         keywords=keywords,
         img=image_path,
+        img_width=image_width,
         visibility=visibility,
         category=category,
     )
 
     num_created_recipes.labels(source="api").inc()
-    created_recipe = crud.create_recipe(db=db, recipe=recipe, user_id=user_id)
-    await index_recipe(created_recipe)
-    return created_recipe
+    created_recipe = await crud.create_recipe(db=db, recipe=recipe, user_id=user_id)
+    return RecipeJSONResponse(created_recipe, status_code=201)
+
+
+async def ndjson_lines(request: Request):
+    """(line number, bytes) for every non-empty line of a streamed body, without buffering it."""
+    buffer = b""
+    number = 0
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            number += 1
+            if line.strip():
+                yield number, line
+        if len(buffer) > MAX_IMPORT_LINE_BYTES:
+            raise HTTPException(status_code=413, detail=f"Line {number + 1} is longer than {MAX_IMPORT_LINE_BYTES} bytes")
+    if buffer.strip():
+        yield number + 1, buffer
+
+
+#one transaction per batch; a failed batch is reported row by row and the import goes on
+@router.post("/import", response_model=schemas.RecipeImportReport)
+async def import_recipes(
+    request: Request,
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db),
+):
+    imported = 0
+    failed = 0
+    errors = []
+
+    def report(line: int, error: str):
+        nonlocal failed
+        failed += 1
+        if len(errors) < MAX_IMPORT_ERRORS:
+            errors.append({"line": line, "error": error})
+
+    async def flush(batch: list[tuple[int, schemas.RecipeCreate]]):
+        nonlocal imported
+        try:
+            await crud.import_recipes(db, [recipe for _, recipe in batch], user_id)
+        except Exception as e:
+            await db.rollback()
+            for line, _ in batch:
+                report(line, f"Batch failed: {e.__class__.__name__}")
+            return
+        imported += len(batch)
+        num_created_recipes.labels(source="import").inc(len(batch))
+
+    batch = []
+    async for line, raw in ndjson_lines(request):
+        try:
+            batch.append((line, schemas.RecipeCreate.model_validate_json(raw)))
+        except ValidationError as e:
+            report(line, "; ".join(f"{'.'.join(map(str, err['loc'])) or 'row'}: {err['msg']}" for err in e.errors()))
+            continue
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            await flush(batch)
+            batch = []
+    if batch:
+        await flush(batch)
+
+    return {"imported": imported, "failed": failed, "errors": errors}
 
 
 @router.put("/{recipe_id}", response_model=schemas.Recipe)
 async def update_recipe(
     recipe_id: int,
+    background_tasks: BackgroundTasks,
     recipe_name: str | None = Form(None),
     description: str | None = Form(None),
     cooking_time: time | None = Form(None),
@@ -147,9 +388,9 @@ async def update_recipe(
     category: schemas.CategoryEnum | None = Form(None),
     image: UploadFile | None = File(None),
     user_id: int = Depends(get_current_user_id),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    recipe_raw = db.query(models.Recipe).filter(models.Recipe.recipe_id == recipe_id).first()
+    recipe_raw = await db.get(models.Recipe, recipe_id)
 
     if not recipe_raw:
         raise HTTPException(status_code=404, detail="Recipe not found")
@@ -178,42 +419,58 @@ async def update_recipe(
         update_data["category"] = category
 
     if image is not None:
-        if image.content_type not in {"image/jpeg", "image/png", "image/webp"}:
-            raise HTTPException(status_code=400, detail="Unsupported image type")
         update_data["img"] = await save_image(image)
+        update_data["img_width"] = await stored_image_width(update_data["img"])
+        background_tasks.add_task(create_derivatives, update_data["img"])
 
     updates = schemas.RecipeUpdate(**update_data)
 
-    updated = crud.update_recipe(db, recipe_id, updates)
-    await update_recipe_es(updated)
-    return updated
+    updated = await crud.update_recipe(db, recipe_id, updates)
+    return RecipeJSONResponse(updated)
 
 
 @router.delete("/{recipe_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_recipe(
     recipe_id: int,
     user_id: int = Depends(get_current_user_id),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    recipe = db.query(models.Recipe).filter(models.Recipe.recipe_id == recipe_id).first()
+    recipe = await db.get(models.Recipe, recipe_id)
     if not recipe:
         raise HTTPException(status_code=404, detail="Recipe not found")
     if recipe.user_id != user_id:
         raise HTTPException(status_code=403, detail="Not allowed to delete this recipe")
 
-    deleted = crud.delete_recipe(db, recipe_id=recipe_id)
-    if deleted:
-        await delete_recipe_es(recipe_id)
+    await crud.delete_recipe(db, recipe_id=recipe_id)
     return None
 
 @router.get("/user/{user_id}", response_model=list[schemas.Recipe])
-def get_recipes_created_by_user(user_id: int, db: Session = Depends(get_db)):
-    recipes = crud.get_recipes_by_user(db, user_id=user_id)
-    return recipes
+async def get_recipes_created_by_user(
+    user_id: int,
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    viewer_id: int | None = Depends(get_optional_user_id),
+    db: AsyncSession = Depends(get_db),
+):
+    recipes = await crud.get_recipes_by_user(
+        db, user_id=user_id, limit=limit, cursor=parse_cursor(cursor), viewer_id=viewer_id
+    )
+    response = RecipeJSONResponse(recipes)
+    set_next_cursor(response, recipes, limit)
+    return response
 
 
 @router.get("/by-username/{username}", response_model=list[schemas.Recipe])
-async def get_recipes_created_by_username(username: str, db: Session = Depends(get_db)):
+async def get_recipes_created_by_username(
+    username: str,
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    viewer_id: int | None = Depends(get_optional_user_id),
+    db: AsyncSession = Depends(get_db),
+):
+    page_cursor = parse_cursor(cursor)
     user_id = await get_user_id_by_username(username)
-    recipes = crud.get_recipes_by_user(db, user_id=user_id)
-    return recipes
+    recipes = await crud.get_recipes_by_user(db, user_id=user_id, limit=limit, cursor=page_cursor, viewer_id=viewer_id)
+    response = RecipeJSONResponse(recipes)
+    set_next_cursor(response, recipes, limit)
+    return response
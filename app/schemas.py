@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional, List
+from pydantic import BaseModel, ConfigDict
+from typing import Optional, List, Dict
 from datetime import time, datetime
 from enum import Enum
 
@@ -26,8 +26,7 @@ class IngredientRead(BaseModel):
     amount: float
     unit: str
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class RecipeBase(BaseModel):
@@ -45,7 +44,7 @@ class RecipeBase(BaseModel):
 
 
 class RecipeCreate(RecipeBase):
-    pass
+    img_width: Optional[int] = None
 
 
 class RecipeUpdate(BaseModel):
@@ -57,6 +56,7 @@ class RecipeUpdate(BaseModel):
     instructions: Optional[str] = None
     keywords: Optional[str] = None
     img: Optional[str] = None
+    img_width: Optional[int] = None
     visibility: Optional[VisibilityEnum] = None
     category: Optional[CategoryEnum] = None
     #manjka še da bi lahko sestavine posodobil, malo bolj komplicirano
@@ -65,6 +65,7 @@ class Recipe(BaseModel):
     recipe_id: int
     user_id: int
     created_at: datetime
+    updated_at: datetime
     recipe_name: str
     description: Optional[str]
     cooking_time: time
@@ -74,8 +75,24 @@ class Recipe(BaseModel):
     instructions: str
     keywords: Optional[str]
     img: str
+    img_srcset: Dict[str, str] = {}
     visibility: VisibilityEnum
     category: CategoryEnum
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
+
+
+class RecipeBatch(BaseModel):
+    recipes: List[Recipe]
+    missing: List[int]
+
+
+class ImportRowError(BaseModel):
+    line: int
+    error: str
+
+
+class RecipeImportReport(BaseModel):
+    imported: int
+    failed: int
+    errors: List[ImportRowError]
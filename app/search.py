@@ -0,0 +1,109 @@
+from typing import Optional
+from .elastic import client
+
+RECIPES_INDEX = "recipes"
+
+# explicit mapping so times are range-filterable and ingredient names can be
+# matched both as free text and exactly (case-insensitive) for filters
+RECIPES_SETTINGS = {
+    "analysis": {
+        "normalizer": {
+            "lowercase": {"type": "custom", "filter": ["lowercase"]},
+        },
+    },
+}
+
+RECIPES_MAPPINGS = {
+    "dynamic": "strict",
+    "properties": {
+        "recipe_id": {"type": "integer"},
+        "user_id": {"type": "integer"},
+        "recipe_name": {
+            "type": "text",
+            "fields": {"raw": {"type": "keyword", "normalizer": "lowercase"}},
+        },
+        "description": {"type": "text"},
+        "ingredients": {
+            "type": "text",
+            "fields": {"raw": {"type": "keyword", "normalizer": "lowercase"}},
+        },
+        "keywords": {"type": "text"},
+        "cooking_time": {"type": "date", "format": "HH:mm:ss"},
+        "total_time": {"type": "date", "format": "HH:mm:ss"},
+        "category": {"type": "keyword"},
+        "visibility": {"type": "keyword"},
+        "created_at": {"type": "date"},
+    },
+}
+
+SEARCH_FIELDS = ["recipe_name^3", "ingredients^2", "keywords^2", "description"]
+
+
+async def ensure_index():
+    if not await client.indices.exists(index=RECIPES_INDEX):
+        await client.indices.create(
+            index=RECIPES_INDEX,
+            settings=RECIPES_SETTINGS,
+            mappings=RECIPES_MAPPINGS,
+        )
+
+
+def recipe_document(recipe: dict) -> dict:
+    return {
+        "recipe_name": recipe["recipe_name"],
+        "recipe_id": recipe["recipe_id"],
+        "user_id": recipe["user_id"],
+        "description": recipe["description"],
+        "ingredients": [r["name"] for r in recipe["ingredients"]],
+        "cooking_time": recipe["cooking_time"].strftime("%H:%M:%S"),
+        "total_time": recipe["total_time"].strftime("%H:%M:%S"),
+        "keywords": recipe["keywords"],
+        "category": recipe["category"].value,
+        "visibility": recipe["visibility"].value,
+        "created_at": recipe["created_at"].isoformat(),
+    }
+
+
+def build_search(
+    q: Optional[str] = None,
+    category: Optional[str] = None,
+    max_total_time: Optional[str] = None,
+    include_ingredients: Optional[list[str]] = None,
+    exclude_ingredients: Optional[list[str]] = None,
+    viewer_id: Optional[int] = None,
+) -> tuple[dict, list]:
+    """
+    Build the bool query and sort for a recipe search.
+
+    Anonymous callers only see public recipes; authenticated callers also
+    see their own. With a text query results are ranked by relevance,
+    otherwise newest first; recipe_id breaks ties so search_after is stable.
+    """
+    visible = [{"term": {"visibility": "public"}}]
+    if viewer_id is not None:
+        visible.append({"term": {"user_id": viewer_id}})
+
+    filters = [{"bool": {"should": visible, "minimum_should_match": 1}}]
+    if category:
+        filters.append({"term": {"category": category}})
+    if max_total_time:
+        filters.append({"range": {"total_time": {"lte": max_total_time}}})
+    for name in include_ingredients or []:
+        filters.append({"term": {"ingredients.raw": name.lower()}})
+
+    query = {"bool": {"filter": filters}}
+    if exclude_ingredients:
+        query["bool"]["must_not"] = [
+            {"terms": {"ingredients.raw": [name.lower() for name in exclude_ingredients]}}
+        ]
+
+    if q:
+        query["bool"]["must"] = [
+            {"multi_match": {"query": q, "fields": SEARCH_FIELDS, "fuzziness": "AUTO"}}
+        ]
+        sort = [{"_score": "desc"}, {"recipe_id": "desc"}]
+    else:
+        sort = [{"created_at": "desc"}, {"recipe_id": "desc"}]
+
+    return query, sort
+
@@ -0,0 +1,57 @@
+import os
+import time
+import httpx
+from ..utils.timing import record
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+
+
+class SharedClient:
+    """
+    Lazily created httpx.AsyncClient shared by every call to one dependency,
+    so requests reuse pooled keep-alive connections instead of paying TCP
+    (and TLS) setup each time. Closed from the app lifespan on shutdown.
+    """
+
+    def __init__(self, name: str, timeout: float, http2: bool = True):
+        self.name = name
+        self.timeout = timeout
+        self.http2 = http2 and HTTP2_AVAILABLE
+        self._client: httpx.AsyncClient | None = None
+
+    def get(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                http2=self.http2,
+                limits=httpx.Limits(
+                    max_connections=MAX_CONNECTIONS,
+                    max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=KEEPALIVE_EXPIRY,
+                ),
+                event_hooks={"request": [self._started], "response": [self._finished]},
+            )
+        return self._client
+
+    # time to response headers, recorded under the dependency's name
+    async def _started(self, request: httpx.Request):
+        request.extensions["timing_started"] = time.perf_counter()
+
+    async def _finished(self, response: httpx.Response):
+        started = response.request.extensions.get("timing_started")
+        if started is not None:
+            record(self.name, time.perf_counter() - started)
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
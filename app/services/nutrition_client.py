@@ -1,10 +1,23 @@
+import asyncio
 import os
-import httpx
-from fastapi import HTTPException
+from .http import SharedClient
+from ..metrics import cache_hits, cache_misses
+from ..utils.cache import TTLCache
 
 
 API_URL = "https://api.api-ninjas.com/v1/nutrition"
 API_KEY = os.getenv("NINJAS_NUTRITION_API_KEY")
+NUTRITION_API_TIMEOUT = float(os.getenv("NUTRITION_API_TIMEOUT", "10.0"))
+NUTRITION_MAX_CONCURRENCY = int(os.getenv("NUTRITION_MAX_CONCURRENCY", "4"))
+NUTRITION_BATCH_SIZE = int(os.getenv("NUTRITION_BATCH_SIZE", "5"))
+NUTRITION_CACHE_TTL = float(os.getenv("NUTRITION_CACHE_TTL", "86400"))
+NUTRITION_CACHE_MAX_SIZE = int(os.getenv("NUTRITION_CACHE_MAX_SIZE", "10000"))
+
+CACHE_NAME = "nutrition_query"
+
+http_client = SharedClient("nutrition_api", timeout=NUTRITION_API_TIMEOUT)
+nutrition_cache = TTLCache(CACHE_NAME, maxsize=NUTRITION_CACHE_MAX_SIZE, ttl=NUTRITION_CACHE_TTL)
+_api_slots = asyncio.Semaphore(NUTRITION_MAX_CONCURRENCY)
 
 async def fetch_nutrition(query: str):
     if not API_KEY:
@@ -12,7 +25,65 @@ async def fetch_nutrition(query: str):
     headers = {"X-Api-Key": API_KEY}
     params = {"query": query}
 
-    async with httpx.AsyncClient(timeout=10) as client:
-        resp = await client.get(API_URL, headers=headers, params=params)
-        resp.raise_for_status()
-        return resp.json()
\ No newline at end of file
+    async with _api_slots:
+        resp = await http_client.get().get(API_URL, headers=headers, params=params)
+    resp.raise_for_status()
+    return resp.json()
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+def _names_match(query: str, item: dict) -> bool:
+    # queries are "amount unit name" and api-ninjas echoes the food name
+    name = normalize_query(str(item.get("name", "")))
+    return bool(name) and (query == name or query.endswith(" " + name))
+
+
+def _batchable(query: str) -> bool:
+    # api-ninjas splits a name like "salt and pepper" into two foods
+    return " and " not in f" {query} "
+
+
+async def _fetch_chunk(chunk: list[str]) -> list[list[dict]]:
+    if len(chunk) == 1:
+        return [await fetch_nutrition(chunk[0])]
+
+    items = await fetch_nutrition(" and ".join(chunk))
+    if len(items) == len(chunk) and all(_names_match(q, item) for q, item in zip(chunk, items)):
+        return [[item] for item in items]
+    # the parser dropped, split or renamed something, so items cannot be
+    # matched back to queries; ask for each one on its own
+    return list(await asyncio.gather(*(fetch_nutrition(query) for query in chunk)))
+
+
+async def fetch_nutrition_many(queries: list[str]) -> list[list[dict]]:
+    """
+    Look up several "amount unit name" queries and return the API items for
+    each, in order. Repeated and previously seen queries are served from an
+    in-process cache; the rest are combined NUTRITION_BATCH_SIZE at a time
+    into one api-ninjas query and sent with bounded concurrency. Combined
+    answers are only used when every item names its query's food.
+    """
+    keys = [normalize_query(query) for query in queries]
+    results = {}
+    missing = []
+    for key in dict.fromkeys(keys):
+        cached = nutrition_cache.get(key)
+        if cached is not None:
+            cache_hits.labels(cache=CACHE_NAME).inc()
+            results[key] = cached
+        else:
+            cache_misses.labels(cache=CACHE_NAME).inc()
+            missing.append(key)
+
+    batchable = [key for key in missing if _batchable(key)]
+    chunks = [batchable[i:i + NUTRITION_BATCH_SIZE] for i in range(0, len(batchable), NUTRITION_BATCH_SIZE)]
+    chunks += [[key] for key in missing if not _batchable(key)]
+    for chunk, chunk_items in zip(chunks, await asyncio.gather(*(_fetch_chunk(c) for c in chunks))):
+        for key, items in zip(chunk, chunk_items):
+            nutrition_cache.set(key, items)
+            results[key] = items
+
+    return [results[key] for key in keys]
@@ -0,0 +1,86 @@
+"""
+In-process cache of serialized recipe responses.
+
+Single recipes are cached by id and list pages by their query. crud drops
+a recipe's entry, and every cached page, whenever it creates, updates or
+deletes a recipe in this process. Other workers have their own caches, so
+every hit is first checked against the recipes' current updated_at (see
+is_current): a recipe that was changed, made private or deleted elsewhere
+is never served from a stale entry. What can lag by up to RECIPE_CACHE_TTL
+is a cached page not yet listing a recipe created, or made public, in
+another worker.
+"""
+import hashlib
+import os
+from datetime import datetime, timezone
+from typing import NamedTuple, Optional
+from ..utils.cache import TTLCache
+from ..utils.responses import dumps
+
+RECIPE_CACHE_TTL = float(os.getenv("RECIPE_CACHE_TTL", "30"))
+RECIPE_CACHE_SIZE = int(os.getenv("RECIPE_CACHE_SIZE", "10000"))
+
+recipes = TTLCache("recipe", RECIPE_CACHE_SIZE, RECIPE_CACHE_TTL)
+pages = TTLCache("recipe_page", RECIPE_CACHE_SIZE, RECIPE_CACHE_TTL)
+
+
+class Payload(NamedTuple):
+    body: bytes
+    etag: str
+    next_cursor: Optional[str] = None
+    # single recipes only, so a cached body can be checked against the viewer
+    visibility: Optional[str] = None
+    user_id: Optional[int] = None
+    # (recipe_id, recipe_etag) of every recipe in the body
+    versions: tuple[tuple[int, str], ...] = ()
+
+
+def recipe_etag(recipe: dict) -> str:
+    updated_at: datetime = recipe["updated_at"]
+    # SQLite hands back naive datetimes; everything stored here is UTC
+    if updated_at.tzinfo is None:
+        updated_at = updated_at.replace(tzinfo=timezone.utc)
+    return f'"{recipe["recipe_id"]}-{int(updated_at.timestamp() * 1_000_000)}"'
+
+
+def recipe_payload(recipe: dict) -> Payload:
+    etag = recipe_etag(recipe)
+    return Payload(
+        dumps(recipe),
+        etag,
+        visibility=recipe["visibility"],
+        user_id=recipe["user_id"],
+        versions=((recipe["recipe_id"], etag),),
+    )
+
+
+def page_payload(page: list[dict], next_cursor: Optional[str]) -> Payload:
+    body = dumps(page)
+    return Payload(
+        body,
+        f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"',
+        next_cursor,
+        versions=tuple((recipe["recipe_id"], recipe_etag(recipe)) for recipe in page),
+    )
+
+
+def is_current(payload: Payload, current: dict[int, str]) -> bool:
+    """
+    Whether every recipe in payload is unchanged, given the current etags
+    of the recipes that still exist (recipe_etag of crud.get_recipe_versions).
+    """
+    return all(current.get(recipe_id) == etag for recipe_id, etag in payload.versions)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+
+
+def invalidate(recipe_id: Optional[int] = None):
+    if recipe_id is not None:
+        recipes.delete(str(recipe_id))
+    pages.clear()
@@ -0,0 +1,56 @@
+import os
+from datetime import datetime, timedelta, timezone
+from sqlalchemy.ext.asyncio import AsyncSession
+from .. import async_crud as crud
+from ..nutrition import NUTRIENTS, convert_to_num, per_100g_from_items, summarize, to_grams
+from .nutrition_client import fetch_nutrition_many
+
+INGREDIENT_NUTRITION_MAX_AGE = timedelta(days=float(os.getenv("INGREDIENT_NUTRITION_MAX_AGE_DAYS", "90")))
+
+
+def _is_stale(ingredient, now: datetime) -> bool:
+    if ingredient.nutrition_per_100g is None or ingredient.nutrition_updated_at is None:
+        return True
+    updated_at = ingredient.nutrition_updated_at
+    if updated_at.tzinfo is None:
+        updated_at = updated_at.replace(tzinfo=timezone.utc)
+    return now - updated_at > INGREDIENT_NUTRITION_MAX_AGE
+
+
+async def refresh_ingredient_nutrition(db: AsyncSession, ingredients) -> None:
+    """Fetch per-100g values from api-ninjas for ingredients that have none or stale ones."""
+    now = datetime.now(timezone.utc)
+    stale = list({i.ingredient_id: i for i in ingredients if _is_stale(i, now)}.values())
+    if not stale:
+        return
+    results = await fetch_nutrition_many([f"100g {i.name}" for i in stale])
+    await crud.save_ingredient_nutrition(
+        db, {i.ingredient_id: per_100g_from_items(items) for i, items in zip(stale, results)}
+    )
+
+
+async def compute_recipe_nutrition(db: AsyncSession, recipe_id: int, servings: int) -> dict:
+    """
+    Compute and store a recipe's nutrition from per-100g ingredient values.
+    Amounts are converted to grams locally; only units with no fixed weight
+    (pieces, cloves...) ask the API how much the amount weighs.
+    """
+    rows = await crud.get_recipe_ingredient_rows(db, recipe_id)
+    await refresh_ingredient_nutrition(db, [row.ingredient for row in rows])
+
+    grams = [to_grams(row.amount, row.unit, row.ingredient.name) for row in rows]
+    unweighed = [i for i, g in enumerate(grams) if g is None]
+    if unweighed:
+        queries = [f"{rows[i].amount:g} {rows[i].unit} {rows[i].ingredient.name}" for i in unweighed]
+        for i, items in zip(unweighed, await fetch_nutrition_many(queries)):
+            grams[i] = sum(convert_to_num(item.get("serving_size_g")) for item in items)
+
+    totals = {field: 0.0 for field in NUTRIENTS}
+    for row, weight in zip(rows, grams):
+        per_100g = row.ingredient.nutrition_per_100g or {}
+        for field in NUTRIENTS:
+            totals[field] += convert_to_num(per_100g.get(field)) * weight / 100.0
+
+    total_weight_g = sum(grams)
+    await crud.save_recipe_nutrition(db, recipe_id, total_weight_g, totals)
+    return summarize(totals, total_weight_g, servings)
@@ -1,22 +1,45 @@
 import os
 import httpx
 from fastapi import HTTPException
+from .http import SharedClient
+from ..utils.cache import MemoryBackend, RedisBackend, SingleFlight, TTLCache, cached_lookup
 
 
 USER_SERVICE_URL = os.getenv("USER_SERVICE_URL", "http://user_service:8000")
+USER_SERVICE_TIMEOUT = float(os.getenv("USER_SERVICE_TIMEOUT", "5.0"))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "300"))
+USER_CACHE_NOT_FOUND_TTL = float(os.getenv("USER_CACHE_NOT_FOUND_TTL", "30"))
+USER_CACHE_MAX_SIZE = int(os.getenv("USER_CACHE_MAX_SIZE", "10000"))
+USER_CACHE_REDIS_URL = os.getenv("USER_CACHE_REDIS_URL")
 
+CACHE_NAME = "user_id"
 
-async def get_user_id_by_username(username: str) -> int:
-    """Resolve a username to user_id via user-service."""
+# plain HTTP inside the cluster, so no HTTP/2 (h2c) here
+http_client = SharedClient("user_service", timeout=USER_SERVICE_TIMEOUT, http2=False)
+
+
+def _build_cache_backend():
+    if USER_CACHE_REDIS_URL:
+        import redis.asyncio as redis
+        return RedisBackend(redis.from_url(USER_CACHE_REDIS_URL), prefix=f"{CACHE_NAME}:")
+    return MemoryBackend(TTLCache(CACHE_NAME, maxsize=USER_CACHE_MAX_SIZE, ttl=USER_CACHE_TTL))
+
+
+cache_backend = _build_cache_backend()
+_lookups = SingleFlight()
+
+
+async def _fetch_user_id(username: str) -> dict:
     url = f"{USER_SERVICE_URL}/users/by-username/{username}"
     try:
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            resp = await client.get(url)
+        resp = await http_client.get().get(url)
     except httpx.HTTPError as exc:
         raise HTTPException(status_code=502, detail=f"user-service unavailable: {exc}") from exc
 
     if resp.status_code == 404:
-        raise HTTPException(status_code=404, detail="User not found")
+        entry = {"user_id": None}
+        await cache_backend.set(username, entry, USER_CACHE_NOT_FOUND_TTL)
+        return entry
     if resp.status_code != 200:
         raise HTTPException(status_code=502, detail="Failed to resolve user")
 
@@ -24,4 +47,17 @@ async def get_user_id_by_username(username: str) -> int:
     user_id = data.get("user_id")
     if user_id is None:
         raise HTTPException(status_code=502, detail="Malformed response from user-service")
-    return user_id
+
+    entry = {"user_id": user_id}
+    await cache_backend.set(username, entry, USER_CACHE_TTL)
+    return entry
+
+
+async def get_user_id_by_username(username: str) -> int:
+    """Resolve a username to user_id via user-service, cached and coalesced."""
+    entry = await cached_lookup(
+        cache_backend, CACHE_NAME, username, lambda: _fetch_user_id(username), _lookups
+    )
+    if entry["user_id"] is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return entry["user_id"]
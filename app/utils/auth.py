@@ -1,28 +1,100 @@
-import os, jwt
+import hashlib
+import os
+import threading
+import time
+import jwt
 from fastapi import HTTPException, Security
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from jwt import ExpiredSignatureError, InvalidTokenError
+from jwt import ExpiredSignatureError, InvalidTokenError, PyJWKClientConnectionError, PyJWKClientError
+from .cache import TTLCache
 
 
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 JWT_SECRET = os.getenv("JWT_SECRET")
 JWT_ALGORITHM = os.getenv("JWT_ALGORITHM")
+# asymmetric algorithms (RS256, ES256, ...) verify with a public key from a
+# PEM file or a JWKS document instead of JWT_SECRET
+JWT_PUBLIC_KEY_FILE = os.getenv("JWT_PUBLIC_KEY_FILE")
+JWT_JWKS_URL = os.getenv("JWT_JWKS_URL")
+JWT_JWKS_CACHE_SECONDS = int(os.getenv("JWT_JWKS_CACHE_SECONDS", "300"))
+# verified tokens are trusted for at most this long, and never past their exp
+JWT_CACHE_TTL = float(os.getenv("JWT_CACHE_TTL", "300"))
+JWT_CACHE_SIZE = int(os.getenv("JWT_CACHE_SIZE", "10000"))
 
-if not JWT_SECRET or not JWT_ALGORITHM:
+ASYMMETRIC = bool(JWT_ALGORITHM) and JWT_ALGORITHM.startswith(("RS", "PS", "ES", "Ed"))
+
+if not JWT_ALGORITHM or not (JWT_SECRET or ASYMMETRIC):
     raise RuntimeError("JWT_SECRET and JWT_ALGORITHM must be set in the environment for recipe_service")
+if ASYMMETRIC and not (JWT_PUBLIC_KEY_FILE or JWT_JWKS_URL):
+    raise RuntimeError(f"{JWT_ALGORITHM} needs JWT_PUBLIC_KEY_FILE or JWT_JWKS_URL to be set for recipe_service")
+
+_public_key = None
+_jwks_client = None
+if ASYMMETRIC and JWT_JWKS_URL:
+    # keys are cached and refetched when a token names an unknown kid, so
+    # rotating keys at the issuer needs no restart
+    _jwks_client = jwt.PyJWKClient(JWT_JWKS_URL, cache_keys=True, lifespan=JWT_JWKS_CACHE_SECONDS)
+elif ASYMMETRIC:
+    with open(JWT_PUBLIC_KEY_FILE) as key_file:
+        _public_key = key_file.read()
+
+# dependencies run in the thread pool, so cache access is serialised
+_verified = TTLCache("jwt", JWT_CACHE_SIZE, JWT_CACHE_TTL)
+_verified_lock = threading.Lock()
+
+
+def verification_key(token: str):
+    if _jwks_client is not None:
+        return _jwks_client.get_signing_key_from_jwt(token).key
+    if _public_key is not None:
+        return _public_key
+    return JWT_SECRET
+
 
 def decode_jwt(token: str) -> dict:
+    """
+    Verify token and return its claims. Verified tokens are cached by their
+    SHA-256 digest, so a client reusing its token skips the signature check
+    until the token expires or JWT_CACHE_TTL passes.
+    """
+    digest = hashlib.sha256(token.encode()).hexdigest()
+    with _verified_lock:
+        cached = _verified.get(digest)
+    if cached is not None:
+        return cached
+
     try:
-        decoded = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        return decoded
+        decoded = jwt.decode(token, verification_key(token), algorithms=[JWT_ALGORITHM])
     except ExpiredSignatureError:
         raise InvalidTokenError("Token expired")
-    except InvalidTokenError:
+    except PyJWKClientConnectionError:
+        raise
+    except (InvalidTokenError, PyJWKClientError):
         raise InvalidTokenError("Invalid token")
 
+    ttl = JWT_CACHE_TTL
+    if "exp" in decoded:
+        ttl = min(ttl, decoded["exp"] - time.time())
+    if ttl > 0:
+        with _verified_lock:
+            _verified.set(digest, decoded, ttl)
+    return decoded
+
 def get_current_user_id(credentials: HTTPAuthorizationCredentials = Security(security)) -> int:
     try:
         payload = decode_jwt(credentials.credentials)
         return payload["user_id"]
     except InvalidTokenError as e:
         raise HTTPException(status_code=401, detail=str(e))
+    except PyJWKClientConnectionError:
+        raise HTTPException(status_code=503, detail="Token signing keys unavailable")
+
+
+def get_optional_user_id(
+    credentials: HTTPAuthorizationCredentials | None = Security(optional_security),
+) -> int | None:
+    """Like get_current_user_id, but anonymous callers get None instead of a 401."""
+    if credentials is None:
+        return None
+    return get_current_user_id(credentials)
@@ -0,0 +1,114 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional
+from ..metrics import cache_hits, cache_misses, cache_evictions
+
+
+class TTLCache:
+    """
+    In-process LRU cache with a per-entry TTL and a cap on size. Expired
+    entries are dropped on access; the least recently used entry is evicted
+    when the cache is full.
+    """
+
+    def __init__(self, name: str, maxsize: int, ttl: float, clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._data: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= self.clock():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        self._data[key] = (self.clock() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            cache_evictions.labels(cache=self.name).inc()
+
+    def delete(self, key: str):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+
+class MemoryBackend:
+    """Async facade over TTLCache so it is interchangeable with RedisBackend."""
+
+    def __init__(self, cache: TTLCache):
+        self.cache = cache
+
+    async def get(self, key: str) -> Optional[Any]:
+        return self.cache.get(key)
+
+    async def set(self, key: str, value: Any, ttl: float):
+        self.cache.set(key, value, ttl)
+
+
+class RedisBackend:
+    """
+    Shared cache on any client with the redis.asyncio get/set(ex=) interface,
+    so replicas see each other's entries. Values are stored as JSON.
+    """
+
+    def __init__(self, redis, prefix: str):
+        self.redis = redis
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[Any]:
+        raw = await self.redis.get(self.prefix + key)
+        return None if raw is None else json.loads(raw)
+
+    async def set(self, key: str, value: Any, ttl: float):
+        await self.redis.set(self.prefix + key, json.dumps(value), ex=max(int(ttl), 1))
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls for the same key: the first caller runs the
+    loader, everyone arriving while it is in flight awaits the same result.
+    """
+
+    def __init__(self):
+        self._inflight: dict[str, asyncio.Future] = {}
+
+    async def do(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(loader())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # shield so one cancelled waiter does not cancel the shared lookup
+        return await asyncio.shield(task)
+
+
+async def cached_lookup(
+    backend,
+    name: str,
+    key: str,
+    loader: Callable[[], Awaitable[Any]],
+    flight: SingleFlight,
+) -> Any:
+    """Return backend[key], or load it once (coalesced) on a miss."""
+    value = await backend.get(key)
+    if value is not None:
+        cache_hits.labels(cache=name).inc()
+        return value
+    cache_misses.labels(cache=name).inc()
+    return await flight.do(key, loader)
@@ -0,0 +1,188 @@
+import asyncio
+import logging
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from . import storage
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:  # derivatives are an optimisation; originals still work
+    Image = None
+
+VARIANT_WIDTHS = tuple(int(w) for w in os.getenv("IMAGE_VARIANT_WIDTHS", "320,640,1280").split(","))
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))
+
+_FORMAT_QUALITY = {"webp": 80, "avif": 60}
+VARIANT_FORMATS = tuple(
+    fmt for fmt in os.getenv("IMAGE_VARIANT_FORMATS", "webp,avif").split(",")
+    if Image is not None and features.check(fmt)
+)
+
+logger = logging.getLogger(__name__)
+
+ORIGINAL_NAME = re.compile(r"^[0-9a-f]{32,64}\.(jpg|jpeg|png|webp)$")
+VARIANT_NAME = re.compile(r"^([0-9a-f]{32,64})_\d+\.\w+$")
+
+_pool: ProcessPoolExecutor | None = None
+
+
+def variant_name(filename: str, width: int, fmt: str) -> str:
+    stem, _ = os.path.splitext(filename)
+    return f"{stem}_{width}.{fmt}"
+
+
+def variant_widths(width: int) -> list[int]:
+    """
+    Widths to generate for an original width pixels wide: every configured
+    width below it, plus the original width itself in place of the ones it
+    would have to be upscaled to.
+    """
+    widths = [w for w in VARIANT_WIDTHS if w < width]
+    if any(w >= width for w in VARIANT_WIDTHS):
+        widths.append(width)
+    return sorted(set(widths))
+
+
+def image_srcset(img: str, width: int | None) -> dict[str, str]:
+    """
+    srcset strings per format for an image path like /media/<name>.<ext>
+    whose original is width pixels wide, e.g.
+    {"webp": "/media/<name>_320.webp 320w, /media/<name>_480.webp 480w"}.
+    """
+    if not img.startswith("/media/") or not VARIANT_FORMATS or not width:
+        return {}
+    filename = img[len("/media/"):]
+    return {
+        fmt: ", ".join(f"/media/{variant_name(filename, w, fmt)} {w}w" for w in variant_widths(width))
+        for fmt in VARIANT_FORMATS
+    }
+
+
+# EXIF orientations that rotate the image by 90 degrees
+_TRANSPOSED = {5, 6, 7, 8}
+
+
+def image_width(path: str) -> int | None:
+    """
+    Display width of the image at path, read from its header only, or None
+    if it cannot be read.
+    """
+    if Image is None:
+        return None
+    try:
+        with Image.open(path) as image:
+            width, height = image.size
+            if image.getexif().get(0x0112) in _TRANSPOSED:
+                return height
+            return width
+    except Exception:
+        return None
+
+
+async def stored_image_width(img: str) -> int | None:
+    """image_width for a stored /media path, off the event loop."""
+    if not img.startswith("/media/"):
+        return None
+    return await asyncio.to_thread(image_width, os.path.join(storage.MEDIA_ROOT, img[len("/media/"):]))
+
+
+def _has_variants(directory: str, filename: str, exists) -> bool:
+    width = image_width(os.path.join(directory, filename))
+    return width is not None and all(
+        exists(variant_name(filename, w, fmt)) for w in variant_widths(width) for fmt in VARIANT_FORMATS
+    )
+
+
+def generate_derivatives(path: str) -> list[str]:
+    """
+    Write every variant_widths x format variant next to the original at
+    path, named by its real width. Runs in a worker process; returns the
+    files written.
+    """
+    directory, filename = os.path.split(path)
+    written = []
+    if _has_variants(directory, filename, lambda name: os.path.exists(os.path.join(directory, name))):
+        # content-addressed: an identical upload was processed already
+        return written
+    with Image.open(path) as original:
+        original = ImageOps.exif_transpose(original)
+        if original.mode not in ("RGB", "RGBA"):
+            has_alpha = "A" in original.mode or "transparency" in original.info
+            original = original.convert("RGBA" if has_alpha else "RGB")
+        for width in variant_widths(original.width):
+            resized = original.copy()
+            resized.thumbnail((width, width * 10), Image.Resampling.LANCZOS)
+            for fmt in VARIANT_FORMATS:
+                target = os.path.join(directory, variant_name(filename, width, fmt))
+                tmp = f"{target}.tmp"
+                resized.save(tmp, format=fmt.upper(), quality=_FORMAT_QUALITY.get(fmt, 80))
+                os.replace(tmp, target)
+                written.append(target)
+    return written
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=IMAGE_WORKERS)
+    return _pool
+
+
+async def create_derivatives(img: str) -> None:
+    """
+    Generate derivatives for a stored /media path in the process pool. Runs
+    as a background task, so failures are logged rather than raised; the
+    backfill command picks up anything left behind.
+    """
+    if not VARIANT_FORMATS or not img.startswith("/media/"):
+        return
+    path = os.path.join(storage.MEDIA_ROOT, img[len("/media/"):])
+    loop = asyncio.get_running_loop()
+    try:
+        await loop.run_in_executor(_get_pool(), generate_derivatives, path)
+    except Exception as exc:
+        logger.warning("could not create derivatives for %s: %s", img, exc)
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def missing_derivatives(media_root: str) -> list[str]:
+    """Originals under media_root that lack at least one variant."""
+    names = set(os.listdir(media_root))
+    return [
+        os.path.join(media_root, name)
+        for name in sorted(names)
+        if ORIGINAL_NAME.match(name) and not _has_variants(media_root, name, names.__contains__)
+    ]
+
+
+def backfill(media_root: str | None = None, workers: int = IMAGE_WORKERS) -> int:
+    """
+    Generate derivatives for every stored image that is missing some.
+    Returns how many images were processed successfully.
+
+        python -m app.utils.images
+    """
+    if not VARIANT_FORMATS:
+        return 0
+    paths = missing_derivatives(media_root or storage.MEDIA_ROOT)
+    done = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {path: pool.submit(generate_derivatives, path) for path in paths}
+        for path, future in futures.items():
+            try:
+                print(f"{path}: {len(future.result())} variants")
+                done += 1
+            except Exception as exc:
+                print(f"{path}: failed ({exc})")
+    return done
+
+
+if __name__ == "__main__":
+    print(f"backfilled {backfill()} images")
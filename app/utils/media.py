@@ -0,0 +1,38 @@
+import os
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse
+from starlette.types import Scope
+from .images import ORIGINAL_NAME, VARIANT_NAME
+
+MEDIA_MAX_AGE = int(os.getenv("MEDIA_MAX_AGE", str(365 * 24 * 3600)))
+
+
+class MediaFiles(StaticFiles):
+    """
+    StaticFiles for /media. Stored files are never rewritten under the same
+    name, so successful responses are marked immutable and browsers and the
+    CDN skip revalidation entirely.
+
+    Content-addressed files use their name as a strong ETag: it is stable
+    across replicas and unaffected by the mtime bumps the GC grace period
+    relies on, unlike Starlette's mtime/size ETag. Conditional requests get
+    a 304 and Range/If-Range requests are handled by FileResponse, which
+    hands the file to the server with http.response.pathsend where the
+    server supports it.
+    """
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope: Scope, status_code: int = 200) -> Response:
+        if status_code != 200:
+            return super().file_response(full_path, stat_result, scope, status_code)
+
+        name = os.path.basename(full_path)
+        headers = {"cache-control": f"public, max-age={MEDIA_MAX_AGE}, immutable"}
+        if ORIGINAL_NAME.match(name) or VARIANT_NAME.match(name):
+            headers["etag"] = f'"{name}"'
+        # FileResponse only fills in etag/last-modified that are not set yet
+        response = FileResponse(full_path, headers=headers, stat_result=stat_result)
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response
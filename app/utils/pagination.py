@@ -0,0 +1,54 @@
+import base64
+import json
+from datetime import datetime
+
+
+def _encode(values: list) -> str:
+    raw = json.dumps(values).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode(cursor: str) -> list:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    values = json.loads(base64.urlsafe_b64decode(padded))
+    if not isinstance(values, list):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def encode_cursor(created_at: datetime, recipe_id: int) -> str:
+    """
+    Build an opaque keyset cursor pointing just past (created_at, recipe_id).
+    """
+    return _encode([created_at.isoformat(), recipe_id])
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """
+    Inverse of encode_cursor. Raises ValueError for anything malformed.
+    """
+    try:
+        created_at, recipe_id = _decode(cursor)
+        return datetime.fromisoformat(created_at), int(recipe_id)
+    except (TypeError, ValueError) as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
+def encode_search_after(sort_values: list) -> str:
+    """
+    Wrap the Elasticsearch sort values of the last hit as an opaque cursor.
+    """
+    return _encode(sort_values)
+
+
+def decode_search_after(cursor: str) -> list:
+    """
+    Inverse of encode_search_after. Raises ValueError for anything malformed.
+    """
+    try:
+        values = _decode(cursor)
+    except (TypeError, ValueError) as exc:
+        raise ValueError("Invalid cursor") from exc
+    if len(values) != 2 or not all(isinstance(v, (int, float, str)) for v in values):
+        raise ValueError("Invalid cursor")
+    return values
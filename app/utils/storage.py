@@ -1,21 +1,162 @@
+import asyncio
+import hashlib
 import os
-import uuid
-import shutil
-from fastapi import UploadFile
+import tempfile
+from typing import Iterator
+from fastapi import HTTPException, UploadFile
+from .timing import timed
 
 MEDIA_ROOT = os.getenv("MEDIA_ROOT", "media")
+MAX_IMAGE_BYTES = int(os.getenv("MAX_IMAGE_BYTES", str(10 * 1024 * 1024)))
+CHUNK_SIZE = 256 * 1024
+TEMP_PREFIX = ".upload-"
+
+
+class LocalStorage:
+    """
+    Media files in a local directory, served under /media.
+
+    This is the interface the rest of the service relies on. An
+    S3-compatible backend only has to provide the same methods; they are
+    blocking and always called from the thread pool.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.root, name)
+
+    def temp_file(self):
+        """Staging file for an upload in progress, on the same filesystem."""
+        os.makedirs(self.root, exist_ok=True)
+        return tempfile.NamedTemporaryFile(dir=self.root, prefix=TEMP_PREFIX, delete=False)
+
+    def exists(self, name: str) -> bool:
+        return os.path.exists(self.path(name))
+
+    def put_file(self, src_path: str, name: str):
+        """Move a complete local file into storage under name, atomically."""
+        os.replace(src_path, self.path(name))
+
+    def touch(self, name: str) -> bool:
+        """
+        Mark name as freshly used, so a running GC sweep leaves it alone.
+        Returns False if the file is gone, e.g. because GC just removed it.
+        """
+        try:
+            os.utime(self.path(name))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def delete(self, name: str):
+        try:
+            os.unlink(self.path(name))
+        except FileNotFoundError:
+            pass
+
+    def delete_if_stale(self, name: str, cutoff: float) -> bool:
+        """
+        Delete name unless it was modified after cutoff, checked at delete
+        time rather than from an earlier listing. The file is first moved
+        aside, so a concurrent touch either lands before the check, and the
+        file is put back, or fails, and the caller stores the file again.
+        Returns whether the file was deleted.
+        """
+        aside = self.path(f"{TEMP_PREFIX}gc-{name}")
+        try:
+            os.rename(self.path(name), aside)
+        except FileNotFoundError:
+            return False
+        if os.stat(aside).st_mtime > cutoff:
+            os.replace(aside, self.path(name))
+            return False
+        os.unlink(aside)
+        return True
+
+    def list(self) -> Iterator[tuple[str, float]]:
+        """(name, last modified) for every stored file."""
+        if not os.path.isdir(self.root):
+            return
+        with os.scandir(self.root) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    yield entry.name, entry.stat().st_mtime
+
+
+storage_backend = LocalStorage(MEDIA_ROOT)
+
+
+def sniff_image_type(head: bytes) -> str | None:
+    """
+    Return the file extension for the image format in the first bytes of a
+    file, or None if it is not a supported image.
+    """
+    if head.startswith(b"\xff\xd8\xff"):
+        return ".jpg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return ".png"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ".webp"
+    return None
+
+
+def _discard(tmp):
+    tmp.close()
+    try:
+        os.unlink(tmp.name)
+    except FileNotFoundError:
+        pass
+
+
+def _store(tmp_path: str, name: str) -> None:
+    # identical content is already stored: keep one copy
+    if storage_backend.exists(name) and storage_backend.touch(name):
+        os.unlink(tmp_path)
+    else:
+        storage_backend.put_file(tmp_path, name)
 
 
 async def save_image(upload: UploadFile) -> str:
     """
-    Persist an uploaded image to MEDIA_ROOT and return the public path.
+    Stream an uploaded image into media storage and return the public path.
+
+    The format is taken from the file's magic bytes, not the client's
+    content type, and the upload is rejected as soon as it grows past
+    MAX_IMAGE_BYTES. Files are named by the SHA-256 of their content, so
+    the same photo uploaded twice is stored once. Blocking file I/O runs in
+    the thread pool.
     """
-    os.makedirs(MEDIA_ROOT, exist_ok=True)
-    _, ext = os.path.splitext(upload.filename)
-    filename = f"{uuid.uuid4().hex}{ext.lower()}"
-    destination = os.path.join(MEDIA_ROOT, filename)
+    with timed("storage"):
+        return await _save_image(upload)
+
 
-    with open(destination, "wb") as out_file:
-        shutil.copyfileobj(upload.file, out_file)
+async def _save_image(upload: UploadFile) -> str:
+    head = await upload.read(CHUNK_SIZE)
+    ext = sniff_image_type(head)
+    if ext is None:
+        raise HTTPException(status_code=400, detail="Unsupported image type")
+
+    tmp = await asyncio.to_thread(storage_backend.temp_file)
+    try:
+        digest = hashlib.sha256()
+        size = 0
+        chunk = head
+        while chunk:
+            size += len(chunk)
+            if size > MAX_IMAGE_BYTES:
+                raise HTTPException(status_code=413, detail="Image too large")
+            digest.update(chunk)
+            await asyncio.to_thread(tmp.write, chunk)
+            chunk = await upload.read(CHUNK_SIZE)
+        await asyncio.to_thread(tmp.close)
+
+        filename = f"{digest.hexdigest()}{ext}"
+        await asyncio.to_thread(_store, tmp.name, filename)
+    except BaseException:
+        await asyncio.to_thread(_discard, tmp)
+        raise
 
     return f"/media/{filename}"
+
@@ -0,0 +1,73 @@
+"""
+Per-request time spent in each dependency (database, elasticsearch,
+outbound HTTP, storage).
+
+MetricsMiddleware opens a collection per request; instrumented calls add
+their duration to it through a context variable, so nothing has to be
+passed down the call stack. Calls made outside a request (indexer, GC)
+are not collected.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event
+
+# dependency -> [calls, seconds]
+_timings: ContextVar[Optional[dict[str, list]]] = ContextVar("dependency_timings", default=None)
+
+
+@contextmanager
+def collect():
+    """Collect the timings recorded inside the block into the yielded dict."""
+    timings: dict[str, list] = {}
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
+
+
+def record(dependency: str, seconds: float):
+    timings = _timings.get()
+    if timings is None:
+        return
+    entry = timings.setdefault(dependency, [0, 0.0])
+    entry[0] += 1
+    entry[1] += seconds
+
+
+@contextmanager
+def timed(dependency: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(dependency, time.perf_counter() - started)
+
+
+def server_timing(timings: dict[str, list], total: float) -> str:
+    """Server-Timing header value, e.g. db;dur=4.2;desc="3 calls", total;dur=9.8"""
+    metrics = [
+        f'{dependency};dur={seconds * 1000:.1f};desc="{calls} calls"'
+        for dependency, (calls, seconds) in timings.items()
+    ]
+    metrics.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(metrics)
+
+
+def instrument_engine(engine, dependency: str = "db"):
+    """Time every SQL statement run on a (sync) SQLAlchemy engine."""
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        record(dependency, time.perf_counter() - conn.info["query_started"].pop())
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_started"):
+            record(dependency, time.perf_counter() - conn.info["query_started"].pop())
@@ -0,0 +1,100 @@
+"""
+Per-request overhead of the metrics middleware: no middleware, the old
+@app.middleware("http") version labelled by raw path, and the ASGI
+MetricsMiddleware labelled by route template. Requests are fed straight
+into the ASGI app, without a server or HTTP client.
+
+    python benchmarks/bench_metrics_middleware.py
+"""
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+from fastapi import FastAPI, Request
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.metrics import num_requests, num_errors, request_latency, requests_in_progress  # noqa: E402
+from app.middleware import MetricsMiddleware  # noqa: E402
+
+REQUESTS = 5000
+
+
+def make_app(middleware: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/recipes/{recipe_id}")
+    async def read_recipe(recipe_id: int):
+        return {"recipe_id": recipe_id}
+
+    if middleware == "http":
+        @app.middleware("http")
+        async def metrics_middleware(request: Request, call_next):
+            method = request.method
+            endpoint = request.url.path
+            requests_in_progress.inc()
+            start_time = time.time()
+            try:
+                response = await call_next(request)
+                status_code = response.status_code
+                duration = time.time() - start_time
+                num_requests.labels(method=method, endpoint=endpoint, status_code=status_code).inc()
+                if status_code >= 400:
+                    num_errors.labels(method=method, endpoint=endpoint, status_code=status_code).inc()
+                request_latency.labels(method=method, endpoint=endpoint).observe(duration)
+                return response
+            finally:
+                requests_in_progress.dec()
+    elif middleware == "asgi":
+        app.add_middleware(MetricsMiddleware)
+    return app
+
+
+async def run(app: FastAPI, requests: int) -> float:
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    start = time.perf_counter()
+    for i in range(requests):
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": f"/recipes/{i}",
+            "raw_path": f"/recipes/{i}".encode(),
+            "root_path": "",
+            "query_string": b"",
+            "headers": [(b"host", b"bench")],
+            "client": ("127.0.0.1", 1234),
+            "server": ("bench", 80),
+        }
+        await app(scope, receive, send)
+    return time.perf_counter() - start
+
+
+def series(metric) -> int:
+    return sum(len(m.samples) for m in metric.collect())
+
+
+def main():
+    results = {}
+    for middleware in ("none", "http", "asgi"):
+        app = make_app(middleware)
+        asyncio.run(run(app, 200))  # warm up
+        results[middleware] = min(asyncio.run(run(app, REQUESTS)) for _ in range(3)) / REQUESTS
+
+    print(f"{'middleware':>12} {'us/request':>11} {'overhead us':>12}")
+    for middleware, per_request in results.items():
+        overhead = (per_request - results["none"]) * 1e6
+        print(f"{middleware:>12} {per_request * 1e6:>11.1f} {overhead:>12.1f}")
+    print(f"http_requests_total samples exported after the run: {series(num_requests)}")
+
+
+if __name__ == "__main__":
+    main()
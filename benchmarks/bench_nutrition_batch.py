@@ -0,0 +1,77 @@
+"""
+Compare the per-item aggregation loop behind POST /nutrition with the
+vectorised POST /nutrition/batch path, without calling api-ninjas.
+
+    python benchmarks/bench_nutrition_batch.py
+"""
+import random
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.nutrition import NUTRIENTS, aggregate_batch, aggregate_items, nutrient_vector, summarize  # noqa: E402
+
+UNIQUE_QUERIES = 500
+INGREDIENTS_PER_RECIPE = 12
+
+
+def make_items(rng: random.Random):
+    return [
+        [{"serving_size_g": rng.uniform(5, 300), **{f: rng.uniform(0, 50) for f in NUTRIENTS}}]
+        for _ in range(UNIQUE_QUERIES)
+    ]
+
+
+def make_recipes(rng: random.Random, count: int):
+    return [
+        ([rng.randrange(UNIQUE_QUERIES) for _ in range(INGREDIENTS_PER_RECIPE)], rng.randint(1, 6))
+        for _ in range(count)
+    ]
+
+
+def run_loop(query_items, recipes):
+    results = []
+    for queries, servings in recipes:
+        totals, weight = aggregate_items([item for q in queries for item in query_items[q]])
+        results.append(summarize(totals, weight, servings))
+    return results
+
+
+def run_batch(query_items, recipes):
+    used = sorted({q for queries, _ in recipes for q in queries})
+    positions = {q: pos for pos, q in enumerate(used)}
+    query_vectors = np.array([nutrient_vector(query_items[q]) for q in used])
+    ingredient_queries = np.fromiter(
+        (positions[q] for queries, _ in recipes for q in queries), dtype=np.intp
+    )
+    offsets = np.cumsum([0] + [len(queries) for queries, _ in recipes])
+    servings = np.array([s for _, s in recipes], dtype=float)
+    return aggregate_batch(query_vectors, ingredient_queries, offsets, servings)
+
+
+def best_of(fn, *args, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    rng = random.Random(42)
+    query_items = make_items(rng)
+    print(f"{'recipes':>8} {'loop ms':>10} {'batch ms':>10} {'speedup':>8}")
+    for count in (1, 100, 10_000):
+        recipes = make_recipes(rng, count)
+        loop = best_of(run_loop, query_items, recipes)
+        batch = best_of(run_batch, query_items, recipes)
+        print(f"{count:>8} {loop * 1000:>10.3f} {batch * 1000:>10.3f} {loop / batch:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Compare the serialization work behind GET /recipes/?limit=100: FastAPI's
+response_model path (validate every dict against schemas.Recipe, dump it
+to JSON-compatible values, json.dumps) against encoding the crud dicts
+once with app.utils.responses.dumps, with and without orjson.
+
+    python benchmarks/bench_recipe_serialization.py
+"""
+import json
+import sys
+import time
+from datetime import datetime, time as dtime, timezone
+from pathlib import Path
+
+from pydantic import TypeAdapter
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app import schemas  # noqa: E402
+from app.utils import responses  # noqa: E402
+
+PAGE_SIZE = 100
+INGREDIENTS_PER_RECIPE = 12
+
+
+def make_page():
+    now = datetime.now(timezone.utc)
+    return [
+        {
+            "recipe_id": i,
+            "recipe_name": f"Recipe {i}",
+            "description": "A reasonably long description of the dish " * 3,
+            "cooking_time": dtime(0, 30),
+            "total_time": dtime(1, 0),
+            "servings": 4,
+            "instructions": "Mix everything and bake until golden. " * 10,
+            "keywords": "quick,easy,dinner",
+            "img": f"/media/{'a' * 64}.png",
+            "img_srcset": {"webp": ", ".join(f"/media/{'a' * 64}_{w}.webp {w}w" for w in (320, 640, 1280))},
+            "visibility": schemas.VisibilityEnum.PUBLIC,
+            "category": schemas.CategoryEnum.DINNER,
+            "created_at": now,
+            "updated_at": now,
+            "user_id": 1,
+            "ingredients": [
+                {"name": f"ingredient {j}", "amount": 1.5, "unit": "cup"}
+                for j in range(INGREDIENTS_PER_RECIPE)
+            ],
+        }
+        for i in range(PAGE_SIZE)
+    ]
+
+
+page_adapter = TypeAdapter(list[schemas.Recipe])
+
+
+def response_model_path(page):
+    validated = page_adapter.validate_python(page)
+    return json.dumps(page_adapter.dump_python(validated, mode="json"), ensure_ascii=False).encode("utf-8")
+
+
+def stdlib_path(page):
+    orjson, responses.orjson = responses.orjson, None
+    try:
+        return responses.dumps(page)
+    finally:
+        responses.orjson = orjson
+
+
+def orjson_path(page):
+    return responses.dumps(page)
+
+
+def best_of(fn, *args, repeat=200):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    page = make_page()
+    baseline = best_of(response_model_path, page)
+    print(f"{'path':>16} {'ms/page':>10} {'speedup':>8}")
+    print(f"{'response_model':>16} {baseline * 1000:>10.3f} {1:>7.1f}x")
+    paths = [("stdlib dumps", stdlib_path)]
+    if responses.orjson is not None:
+        paths.append(("orjson dumps", orjson_path))
+    for name, fn in paths:
+        timing = best_of(fn, page)
+        print(f"{name:>16} {timing * 1000:>10.3f} {baseline / timing:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
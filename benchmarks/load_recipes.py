@@ -0,0 +1,112 @@
+"""
+Mixed read/write load against the recipes API, reporting latency percentiles.
+
+By default the app runs in-process on a temporary SQLite database, which is
+enough to show whether database calls block the event loop. Point --url at
+a running service (e.g. docker compose with Postgres) for real numbers.
+
+    python benchmarks/load_recipes.py --concurrency 50 --requests 2000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+import jwt
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+SECRET = os.getenv("JWT_SECRET", "load-test-secret-with-enough-bytes-for-hs256")
+
+
+def recipe_form(i: int):
+    data = {
+        "recipe_name": f"Load test {i}",
+        "description": "generated",
+        "cooking_time": "00:10:00",
+        "total_time": "00:20:00",
+        "servings": "2",
+        "ingredients": json.dumps([
+            {"name": f"ingredient-{j}", "amount": j + 1, "unit": "g"} for j in range(8)
+        ]),
+        "instructions": "mix",
+        "category": "dinner",
+    }
+    files = {"image": ("photo.png", b"\x89PNG\r\n\x1a\n" + b"0" * 1024, "image/png")}
+    return data, files
+
+
+def in_process_client() -> httpx.AsyncClient:
+    tmp = Path(tempfile.mkdtemp())
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tmp / 'load.db'}")
+    os.environ.setdefault("MEDIA_ROOT", str(tmp / "media"))
+    os.environ.setdefault("JWT_SECRET", SECRET)
+    os.environ.setdefault("JWT_ALGORITHM", "HS256")
+    os.environ.setdefault("ELASTICSEARCH_PASSWORD", "unused")
+    from app.main import app
+
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://load")
+
+
+async def run(client: httpx.AsyncClient, concurrency: int, total: int, write_ratio: float):
+    token = jwt.encode({"user_id": 1}, SECRET, algorithm="HS256")
+    headers = {"Authorization": f"Bearer {token}"}
+    created = []
+    for i in range(20):
+        data, files = recipe_form(i)
+        resp = await client.post("/recipes/", data=data, files=files, headers=headers)
+        resp.raise_for_status()
+        created.append(resp.json()["recipe_id"])
+
+    latencies = {"read": [], "write": []}
+    rng = random.Random(1)
+    counter = iter(range(total))
+
+    async def worker():
+        for i in counter:
+            kind = "write" if rng.random() < write_ratio else "read"
+            start = time.perf_counter()
+            if kind == "write":
+                data, files = recipe_form(i)
+                resp = await client.post("/recipes/", data=data, files=files, headers=headers)
+            elif i % 2:
+                resp = await client.get("/recipes/", params={"limit": 20})
+            else:
+                resp = await client.get(f"/recipes/{rng.choice(created)}")
+            latencies[kind].append(time.perf_counter() - start)
+            resp.raise_for_status()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    print(f"{total} requests, concurrency {concurrency}, {total / elapsed:.0f} req/s")
+    for kind, values in latencies.items():
+        if len(values) < 2:
+            continue
+        q = statistics.quantiles(values, n=100)
+        print(f"{kind:>6}: p50 {q[49] * 1000:7.1f} ms  p95 {q[94] * 1000:7.1f} ms  p99 {q[98] * 1000:7.1f} ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", help="base URL of a running service; in-process SQLite if omitted")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    args = parser.parse_args()
+
+    client = httpx.AsyncClient(base_url=args.url, timeout=30) if args.url else in_process_client()
+    async with client:
+        await run(client, args.concurrency, args.requests, args.write_ratio)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,44 @@
+"""
+Gunicorn settings for running several uvicorn workers in one container.
+
+    gunicorn app.main:app
+
+WEB_CONCURRENCY sets the number of workers; it defaults to the CPUs this
+process may run on, so set it to the pod's CPU limit in Kubernetes.
+Metrics are shared through PROMETHEUS_MULTIPROC_DIR, which is emptied on
+start so samples from a previous run are not reported again.
+
+The app is imported once in the master, so create_all runs once instead of
+racing in every worker; workers drop the database connections they
+inherit and open their own.
+"""
+import os
+import shutil
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+worker_class = "uvicorn_worker.UvicornWorker"
+workers = int(os.getenv("WEB_CONCURRENCY", str(len(os.sched_getaffinity(0)))))
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+accesslog = "-"
+preload_app = True
+
+# before the preloaded app creates its first metric files
+_metrics_dir = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+if _metrics_dir:
+    shutil.rmtree(_metrics_dir, ignore_errors=True)
+    os.makedirs(_metrics_dir)
+
+
+def post_fork(server, worker):
+    from app.database import async_engine, engine
+
+    engine.dispose(close=False)
+    async_engine.sync_engine.dispose(close=False)
+
+
+def child_exit(server, worker):
+    # drop the dead worker's live* gauges (requests in flight, outbox gauges)
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
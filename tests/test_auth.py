@@ -54,3 +54,107 @@ def test_get_current_user_id_invalid(monkeypatch):
 
     assert exc.value.status_code == 401
     assert exc.value.detail == "Invalid token"
+
+
+def test_verified_tokens_are_cached(monkeypatch):
+    auth = load_auth_module(monkeypatch)
+    token = jwt.encode({"user_id": 3}, "test-secret", algorithm="HS256")
+    calls = []
+    real_decode = jwt.decode
+
+    def counting_decode(*args, **kwargs):
+        calls.append(1)
+        return real_decode(*args, **kwargs)
+
+    monkeypatch.setattr(auth.jwt, "decode", counting_decode)
+
+    assert auth.decode_jwt(token)["user_id"] == 3
+    assert auth.decode_jwt(token)["user_id"] == 3
+    assert len(calls) == 1
+
+
+def test_cached_token_expires_with_its_exp(monkeypatch):
+    auth = load_auth_module(monkeypatch)
+    clock = [1000.0]
+    auth._verified.clock = lambda: clock[0]
+    exp = datetime.now(timezone.utc) + timedelta(seconds=30)
+    token = jwt.encode({"user_id": 3, "exp": exp}, "test-secret", algorithm="HS256")
+
+    auth.decode_jwt(token)
+    digest = next(iter(auth._verified._data))
+    expires_at, _ = auth._verified._data[digest]
+
+    assert 1000 + 25 < expires_at <= 1000 + 30
+
+
+def test_forged_token_is_not_served_from_cache(monkeypatch):
+    auth = load_auth_module(monkeypatch)
+    auth.decode_jwt(jwt.encode({"user_id": 3}, "test-secret", algorithm="HS256"))
+    forged = jwt.encode({"user_id": 3}, "other-secret", algorithm="HS256")
+
+    with pytest.raises(InvalidTokenError):
+        auth.decode_jwt(forged)
+
+
+def test_rs256_with_public_key_file(monkeypatch, tmp_path):
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    key_file = tmp_path / "public.pem"
+    key_file.write_bytes(private_key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    ))
+    monkeypatch.delenv("JWT_SECRET", raising=False)
+    monkeypatch.setenv("JWT_ALGORITHM", "RS256")
+    monkeypatch.setenv("JWT_PUBLIC_KEY_FILE", str(key_file))
+    auth = importlib.reload(importlib.import_module("app.utils.auth"))
+
+    token = jwt.encode({"user_id": 11}, private_key, algorithm="RS256")
+    assert auth.decode_jwt(token)["user_id"] == 11
+
+    with pytest.raises(InvalidTokenError):
+        auth.decode_jwt(jwt.encode({"user_id": 11}, "test-secret", algorithm="HS256"))
+
+
+def test_es256_with_rotating_jwks(monkeypatch):
+    from cryptography.hazmat.primitives.asymmetric import ec
+
+    keys = {"old": ec.generate_private_key(ec.SECP256R1()), "new": ec.generate_private_key(ec.SECP256R1())}
+    published = ["old"]
+    fetches = []
+
+    def jwks(*args, **kwargs):
+        fetches.append(1)
+        return {"keys": [
+            {**jwt.algorithms.ECAlgorithm.to_jwk(keys[kid].public_key(), as_dict=True), "kid": kid, "alg": "ES256"}
+            for kid in published
+        ]}
+
+    monkeypatch.delenv("JWT_SECRET", raising=False)
+    monkeypatch.delenv("JWT_PUBLIC_KEY_FILE", raising=False)
+    monkeypatch.setenv("JWT_ALGORITHM", "ES256")
+    monkeypatch.setenv("JWT_JWKS_URL", "https://issuer.example/jwks.json")
+    monkeypatch.setattr(jwt.PyJWKClient, "fetch_data", jwks)
+    auth = importlib.reload(importlib.import_module("app.utils.auth"))
+
+    def sign(user_id, kid):
+        return jwt.encode({"user_id": user_id}, keys[kid], algorithm="ES256", headers={"kid": kid})
+
+    assert auth.decode_jwt(sign(1, "old"))["user_id"] == 1
+    assert auth.decode_jwt(sign(2, "old"))["user_id"] == 2
+    assert len(fetches) == 1
+
+    published.append("new")
+    assert auth.decode_jwt(sign(3, "new"))["user_id"] == 3
+    assert len(fetches) == 2
+
+
+def test_asymmetric_algorithm_requires_a_key_source(monkeypatch):
+    monkeypatch.delenv("JWT_SECRET", raising=False)
+    monkeypatch.delenv("JWT_PUBLIC_KEY_FILE", raising=False)
+    monkeypatch.delenv("JWT_JWKS_URL", raising=False)
+    monkeypatch.setenv("JWT_ALGORITHM", "RS256")
+
+    with pytest.raises(RuntimeError):
+        importlib.reload(importlib.import_module("app.utils.auth"))
@@ -0,0 +1,39 @@
+from app.metrics import cache_evictions
+from app.utils.cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = TTLCache("test_ttl", maxsize=10, ttl=5, clock=clock)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=1)
+
+    clock.now = 2
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+
+    clock.now = 5
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache("test_lru", maxsize=2, ttl=60)
+    before = cache_evictions.labels(cache="test_lru")._value.get()
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    assert cache_evictions.labels(cache="test_lru")._value.get() == before + 1
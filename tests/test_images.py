@@ -0,0 +1,90 @@
+import importlib
+
+import pytest
+from PIL import Image
+
+
+def load_images_module(monkeypatch, media_root):
+    monkeypatch.setenv("MEDIA_ROOT", str(media_root))
+    monkeypatch.setenv("IMAGE_VARIANT_WIDTHS", "32,64")
+    monkeypatch.setenv("IMAGE_VARIANT_FORMATS", "webp")
+    importlib.reload(importlib.import_module("app.utils.storage"))
+    return importlib.reload(importlib.import_module("app.utils.images"))
+
+
+def write_png(path, size):
+    Image.new("RGB", size, (200, 50, 50)).save(path, format="PNG")
+
+
+def test_image_srcset_lists_real_widths(monkeypatch, tmp_path):
+    images = load_images_module(monkeypatch, tmp_path)
+
+    assert images.image_srcset("/media/abc.png", 1000) == {
+        "webp": "/media/abc_32.webp 32w, /media/abc_64.webp 64w"
+    }
+    # narrower than the largest width: that variant is the original's size
+    assert images.image_srcset("/media/abc.png", 48) == {
+        "webp": "/media/abc_32.webp 32w, /media/abc_48.webp 48w"
+    }
+    assert images.image_srcset("/media/abc.png", 20) == {"webp": "/media/abc_20.webp 20w"}
+    assert images.image_srcset("/media/abc.png", None) == {}
+    assert images.image_srcset("https://elsewhere/abc.png", 1000) == {}
+
+
+def test_image_width_follows_exif_rotation(monkeypatch, tmp_path):
+    images = load_images_module(monkeypatch, tmp_path)
+    upright = tmp_path / "upright.jpg"
+    rotated = tmp_path / "rotated.jpg"
+    Image.new("RGB", (40, 20)).save(upright, format="JPEG")
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    Image.new("RGB", (40, 20)).save(rotated, format="JPEG", exif=exif)
+
+    assert images.image_width(str(upright)) == 40
+    assert images.image_width(str(rotated)) == 20
+    assert images.image_width(str(tmp_path / "missing.jpg")) is None
+
+
+def test_generate_derivatives_resizes_without_upscaling(monkeypatch, tmp_path):
+    images = load_images_module(monkeypatch, tmp_path)
+    name = "a" * 32
+    original = tmp_path / f"{name}.png"
+    write_png(original, (48, 24))
+
+    written = images.generate_derivatives(str(original))
+
+    assert sorted(written) == [str(tmp_path / f"{name}_32.webp"), str(tmp_path / f"{name}_48.webp")]
+    with Image.open(tmp_path / f"{name}_32.webp") as small:
+        assert small.size == (32, 16)
+    with Image.open(tmp_path / f"{name}_48.webp") as large:
+        assert large.size == (48, 24)
+    # every advertised variant exists at the width it is advertised with
+    for candidate in images.image_srcset(f"/media/{name}.png", 48)["webp"].split(", "):
+        path, descriptor = candidate.split()
+        with Image.open(tmp_path / path[len("/media/"):]) as variant:
+            assert f"{variant.width}w" == descriptor
+    assert images.generate_derivatives(str(original)) == []
+
+
+@pytest.mark.asyncio
+async def test_create_derivatives_logs_instead_of_raising(monkeypatch, tmp_path, caplog):
+    images = load_images_module(monkeypatch, tmp_path)
+    (tmp_path / ("b" * 32 + ".png")).write_bytes(b"\x89PNG\r\n\x1a\nbroken")
+
+    await images.create_derivatives("/media/" + "b" * 32 + ".png")
+    images.shutdown_pool()
+
+    assert "could not create derivatives" in caplog.text
+
+
+def test_backfill_only_processes_images_missing_variants(monkeypatch, tmp_path):
+    images = load_images_module(monkeypatch, tmp_path)
+    done = "c" * 32
+    todo = "d" * 32
+    write_png(tmp_path / f"{done}.png", (40, 40))
+    write_png(tmp_path / f"{todo}.png", (40, 40))
+    images.generate_derivatives(str(tmp_path / f"{done}.png"))
+
+    assert images.missing_derivatives(str(tmp_path)) == [str(tmp_path / f"{todo}.png")]
+    assert images.backfill(str(tmp_path), workers=1) == 1
+    assert images.missing_derivatives(str(tmp_path)) == []
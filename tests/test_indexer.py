@@ -0,0 +1,178 @@
+import importlib
+import sys
+from datetime import datetime, time, timezone
+
+import pytest
+
+
+@pytest.fixture()
+def env(monkeypatch, tmp_path):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'test.db'}")
+    monkeypatch.setenv("ELASTICSEARCH_PASSWORD", "test-secret")
+
+    for module_name in ["app.database", "app.models", "app.crud", "app.elastic", "app.search", "app.indexer"]:
+        sys.modules.pop(module_name, None)
+
+    database = importlib.import_module("app.database")
+    models = importlib.import_module("app.models")
+    crud = importlib.import_module("app.crud")
+    schemas = importlib.import_module("app.schemas")
+    indexer = importlib.import_module("app.indexer")
+    models.Base.metadata.create_all(bind=database.engine)
+
+    bulk_calls = []
+
+    def fake_bulk(errors=(), exc=None):
+        async def async_bulk(client, actions, **kwargs):
+            bulk_calls.append(list(actions))
+            if exc is not None:
+                raise exc
+            return len(bulk_calls[-1]) - len(errors), list(errors)
+        monkeypatch.setattr(indexer, "async_bulk", async_bulk)
+
+    fake_bulk()
+
+    def create(name="Soup"):
+        db = database.SessionLocal()
+        try:
+            recipe = schemas.RecipeCreate(
+                recipe_name=name,
+                cooking_time=time(0, 10),
+                total_time=time(0, 20),
+                servings=2,
+                ingredients=[schemas.IngredientCreate(name="salt", amount=1, unit="g")],
+                instructions="boil",
+                img="/media/x.png",
+                category=schemas.CategoryEnum.DINNER,
+            )
+            return crud.create_recipe(db, recipe, user_id=1)
+        finally:
+            db.close()
+
+    def outbox():
+        db = database.SessionLocal()
+        try:
+            return db.query(models.SearchOutbox).order_by(models.SearchOutbox.id).all()
+        finally:
+            db.close()
+
+    return {
+        "database": database,
+        "crud": crud,
+        "schemas": schemas,
+        "indexer": indexer,
+        "create": create,
+        "outbox": outbox,
+        "bulk_calls": bulk_calls,
+        "fake_bulk": fake_bulk,
+    }
+
+
+@pytest.mark.asyncio
+async def test_writes_are_recorded_in_outbox_and_flushed_in_bulk(env):
+    first = env["create"]("First")
+    second = env["create"]("Second")
+    db = env["database"].SessionLocal()
+    try:
+        env["crud"].delete_recipe(db, second["recipe_id"])
+    finally:
+        db.close()
+    assert [e.recipe_id for e in env["outbox"]()] == [first["recipe_id"], second["recipe_id"], second["recipe_id"]]
+    outbox_ids = [e.id for e in env["outbox"]()]
+
+    handled = await env["indexer"].flush_outbox(env["database"].SessionLocal)
+
+    assert handled == 3
+    assert env["outbox"]() == []
+    (actions,) = env["bulk_calls"]
+    assert actions[0]["_id"] == first["recipe_id"]
+    assert actions[0]["_source"]["recipe_name"] == "First"
+    # the newest outbox entry for a recipe versions its document
+    assert actions[0]["version"] == outbox_ids[0]
+    assert actions[0]["version_type"] == "external"
+    assert actions[1] == {
+        "_op_type": "delete",
+        "_index": "recipes",
+        "_id": second["recipe_id"],
+        "version": outbox_ids[2],
+        "version_type": "external",
+    }
+
+
+@pytest.mark.asyncio
+async def test_failed_documents_are_retried_with_backoff(env):
+    ok = env["create"]("Ok")
+    broken = env["create"]("Broken")
+    env["fake_bulk"](errors=[{"index": {"_id": str(broken["recipe_id"]), "status": 400}}])
+
+    await env["indexer"].flush_outbox(env["database"].SessionLocal)
+
+    (entry,) = env["outbox"]()
+    assert entry.recipe_id == broken["recipe_id"]
+    assert entry.attempts == 1
+    assert entry.available_at.replace(tzinfo=timezone.utc) > datetime.now(timezone.utc)
+    assert ok["recipe_id"] != entry.recipe_id
+
+    # not due yet, so the next flush leaves it alone
+    assert await env["indexer"].flush_outbox(env["database"].SessionLocal) == 0
+
+
+@pytest.mark.asyncio
+async def test_missing_document_on_delete_counts_as_done(env):
+    created = env["create"]()
+    db = env["database"].SessionLocal()
+    try:
+        env["crud"].delete_recipe(db, created["recipe_id"])
+    finally:
+        db.close()
+    env["fake_bulk"](errors=[{"delete": {"_id": str(created["recipe_id"]), "status": 404}}])
+
+    await env["indexer"].flush_outbox(env["database"].SessionLocal)
+
+    assert env["outbox"]() == []
+
+
+@pytest.mark.asyncio
+async def test_version_conflict_counts_as_done(env):
+    # a worker holding an older outbox entry lost the race to a newer one
+    created = env["create"]()
+    env["fake_bulk"](errors=[{"index": {"_id": str(created["recipe_id"]), "status": 409}}])
+
+    await env["indexer"].flush_outbox(env["database"].SessionLocal)
+
+    assert env["outbox"]() == []
+
+
+@pytest.mark.asyncio
+async def test_stale_entry_cannot_outrun_a_newer_one(env):
+    created = env["create"]("Old")
+    db = env["database"].SessionLocal()
+    try:
+        env["crud"].update_recipe(db, created["recipe_id"], env["schemas"].RecipeUpdate(recipe_name="New"))
+    finally:
+        db.close()
+
+    # another worker claims only the older entry
+    await env["indexer"].flush_outbox(env["database"].SessionLocal, batch_size=1)
+    await env["indexer"].flush_outbox(env["database"].SessionLocal)
+
+    older, newer = env["bulk_calls"]
+    assert older[0]["version"] < newer[0]["version"]
+    assert newer[0]["_source"]["recipe_name"] == "New"
+
+
+@pytest.mark.asyncio
+async def test_unreachable_elasticsearch_keeps_whole_batch(env):
+    env["create"]("One")
+    env["create"]("Two")
+    env["fake_bulk"](exc=ConnectionError("es down"))
+
+    await env["indexer"].flush_outbox(env["database"].SessionLocal)
+
+    assert [e.attempts for e in env["outbox"]()] == [1, 1]
+
+
+def test_backoff_is_capped(env):
+    indexer = env["indexer"]
+    assert indexer.backoff(1).total_seconds() == indexer.BASE_BACKOFF
+    assert indexer.backoff(50).total_seconds() == indexer.MAX_BACKOFF
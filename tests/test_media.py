@@ -0,0 +1,80 @@
+import os
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.utils.media import MediaFiles
+
+NAME = "a" * 64 + ".png"
+BODY = b"\x89PNG\r\n\x1a\n" + b"0123456789"
+
+
+def make_client(tmp_path):
+    (tmp_path / NAME).write_bytes(BODY)
+    (tmp_path / "legacy.png").write_bytes(BODY)
+    app = FastAPI()
+    app.mount("/media", MediaFiles(directory=tmp_path), name="media")
+    return TestClient(app)
+
+
+def test_media_is_immutable_with_content_etag(tmp_path):
+    client = make_client(tmp_path)
+
+    response = client.get(f"/media/{NAME}")
+
+    assert response.status_code == 200
+    assert response.content == BODY
+    assert response.headers["cache-control"] == "public, max-age=31536000, immutable"
+    assert response.headers["etag"] == f'"{NAME}"'
+    assert response.headers["accept-ranges"] == "bytes"
+
+
+def test_media_conditional_get_returns_304(tmp_path):
+    client = make_client(tmp_path)
+
+    response = client.get(f"/media/{NAME}", headers={"If-None-Match": f'"{NAME}"'})
+
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == f'"{NAME}"'
+    assert "immutable" in response.headers["cache-control"]
+
+    stale = client.get(f"/media/{NAME}", headers={"If-None-Match": '"other"'})
+    assert stale.status_code == 200
+
+
+def test_media_etag_survives_mtime_change(tmp_path):
+    client = make_client(tmp_path)
+    os.utime(tmp_path / NAME, (1, 1))
+
+    response = client.get(f"/media/{NAME}", headers={"If-None-Match": f'W/"{NAME}"'})
+
+    assert response.status_code == 304
+
+
+def test_media_range_request(tmp_path):
+    client = make_client(tmp_path)
+
+    response = client.get(f"/media/{NAME}", headers={"Range": "bytes=0-7", "If-Range": f'"{NAME}"'})
+
+    assert response.status_code == 206
+    assert response.content == BODY[:8]
+
+
+def test_media_legacy_names_keep_default_etag(tmp_path):
+    client = make_client(tmp_path)
+
+    response = client.get("/media/legacy.png")
+    assert "immutable" in response.headers["cache-control"]
+    etag = response.headers["etag"]
+
+    assert client.get("/media/legacy.png", headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_media_missing_file_is_not_cached(tmp_path):
+    client = make_client(tmp_path)
+
+    response = client.get("/media/missing.png")
+
+    assert response.status_code == 404
+    assert "cache-control" not in response.headers
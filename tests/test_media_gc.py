@@ -0,0 +1,99 @@
+import importlib
+import os
+import sys
+import time
+from datetime import time as dtime
+
+import pytest
+
+KEEP = "a" * 64
+ORPHAN = "b" * 64
+
+
+@pytest.fixture()
+def env(monkeypatch, tmp_path):
+    media_root = tmp_path / "media"
+    media_root.mkdir()
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'test.db'}")
+    monkeypatch.setenv("MEDIA_ROOT", str(media_root))
+    monkeypatch.setenv("ELASTICSEARCH_PASSWORD", "test-secret")
+
+    for module_name in ["app.database", "app.models", "app.crud", "app.utils.storage", "app.utils.images", "app.media_gc"]:
+        sys.modules.pop(module_name, None)
+
+    database = importlib.import_module("app.database")
+    models = importlib.import_module("app.models")
+    crud = importlib.import_module("app.crud")
+    schemas = importlib.import_module("app.schemas")
+    media_gc = importlib.import_module("app.media_gc")
+    models.Base.metadata.create_all(bind=database.engine)
+
+    db = database.SessionLocal()
+    crud.create_recipe(db, schemas.RecipeCreate(
+        recipe_name="Soup",
+        cooking_time=dtime(0, 10),
+        total_time=dtime(0, 20),
+        servings=2,
+        ingredients=[schemas.IngredientCreate(name="salt", amount=1, unit="g")],
+        instructions="boil",
+        img=f"/media/{KEEP}.png",
+        category=schemas.CategoryEnum.DINNER,
+    ), user_id=1)
+    yield media_gc, db, media_root
+    db.close()
+
+
+def write(directory, name, age):
+    path = directory / name
+    path.write_bytes(b"x")
+    modified = time.time() - age
+    os.utime(path, (modified, modified))
+    return path
+
+
+def test_sweep_removes_old_unreferenced_media(env):
+    media_gc, db, media_root = env
+    write(media_root, f"{KEEP}.png", 7200)
+    write(media_root, f"{KEEP}_320.webp", 7200)
+    write(media_root, f"{ORPHAN}.png", 7200)
+    write(media_root, f"{ORPHAN}_320.webp", 7200)
+    write(media_root, ".upload-abc", 7200)
+    write(media_root, "notes.txt", 7200)
+
+    removed = media_gc.sweep_orphans(db, media_gc.storage.LocalStorage(str(media_root)), grace_seconds=3600)
+
+    assert sorted(removed) == sorted([f"{ORPHAN}.png", f"{ORPHAN}_320.webp", ".upload-abc"])
+    assert sorted(p.name for p in media_root.iterdir()) == sorted([f"{KEEP}.png", f"{KEEP}_320.webp", "notes.txt"])
+
+
+def test_sweep_keeps_recent_files(env):
+    media_gc, db, media_root = env
+    write(media_root, f"{ORPHAN}.png", 60)
+    write(media_root, ".upload-abc", 60)
+
+    assert media_gc.sweep_orphans(db, media_gc.storage.LocalStorage(str(media_root)), grace_seconds=3600) == []
+    assert len(list(media_root.iterdir())) == 2
+
+
+def test_sweep_keeps_file_reused_after_listing(env):
+    media_gc, db, media_root = env
+    write(media_root, f"{ORPHAN}.png", 7200)
+
+    class ReusedAfterListing(media_gc.storage.LocalStorage):
+        def list(self):
+            listed = list(super().list())
+            # a duplicate upload reuses the file between listing and delete
+            assert self.touch(f"{ORPHAN}.png")
+            return iter(listed)
+
+    assert media_gc.sweep_orphans(db, ReusedAfterListing(str(media_root)), grace_seconds=3600) == []
+    assert [p.name for p in media_root.iterdir()] == [f"{ORPHAN}.png"]
+
+
+def test_touch_reports_a_file_gc_removed(env):
+    media_gc, _, media_root = env
+    backend = media_gc.storage.LocalStorage(str(media_root))
+    write(media_root, f"{ORPHAN}.png", 7200)
+
+    assert backend.delete_if_stale(f"{ORPHAN}.png", time.time() - 3600)
+    assert not backend.touch(f"{ORPHAN}.png")
@@ -0,0 +1,61 @@
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+SCRIPT = textwrap.dedent(
+    """
+    import multiprocessing
+    from prometheus_client import generate_latest, multiprocess
+    from app import metrics
+
+    def worker(ready, done):
+        metrics.num_created_recipes.labels(source="api").inc()
+        metrics.requests_in_progress.inc()
+        ready.set()
+        done.wait()
+
+    if __name__ == "__main__":
+        ctx = multiprocessing.get_context("fork")
+        done = ctx.Event()
+        workers = []
+        for _ in range(2):
+            ready = ctx.Event()
+            process = ctx.Process(target=worker, args=(ready, done))
+            process.start()
+            ready.wait()
+            workers.append(process)
+        print(generate_latest(metrics.metrics_registry()).decode())
+        done.set()
+        for process in workers:
+            process.join()
+            multiprocess.mark_process_dead(process.pid)
+        print("---")
+        print(generate_latest(metrics.metrics_registry()).decode())
+    """
+)
+
+
+def test_metrics_are_aggregated_across_worker_processes(tmp_path):
+    (tmp_path / "check.py").write_text(SCRIPT)
+    metrics_dir = tmp_path / "prometheus"
+    metrics_dir.mkdir()
+
+    result = subprocess.run(
+        [sys.executable, str(tmp_path / "check.py")],
+        cwd=ROOT,
+        env={"PROMETHEUS_MULTIPROC_DIR": str(metrics_dir), "PYTHONPATH": str(ROOT)},
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    assert result.returncode == 0, result.stderr
+    running, finished = result.stdout.split("---")
+
+    assert 'created_recipes_total{source="api"} 2.0' in running
+    assert "http_requests_in_progress 2.0" in running
+    # counters survive their workers, live gauges do not
+    assert 'created_recipes_total{source="api"} 2.0' in finished
+    assert "http_requests_in_progress 0.0" in finished
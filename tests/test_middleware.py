@@ -0,0 +1,100 @@
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from app import middleware
+from app.middleware import MetricsMiddleware
+from app.utils.media import MediaFiles
+from app.utils.timing import timed
+
+
+def count(endpoint, status_code, method="GET"):
+    value = REGISTRY.get_sample_value(
+        "http_requests_total", {"method": method, "endpoint": endpoint, "status_code": str(status_code)}
+    )
+    return value or 0.0
+
+
+def make_client(tmp_path):
+    (tmp_path / "a.png").write_bytes(b"x")
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/things/{thing_id}")
+    def read_thing(thing_id: int):
+        if thing_id == 0:
+            raise HTTPException(status_code=404)
+        return {}
+
+    @app.get("/slow")
+    def slow():
+        with timed("elasticsearch"):
+            pass
+        with timed("elasticsearch"):
+            pass
+        with timed("db"):
+            pass
+        return {}
+
+    @app.get("/health")
+    def health():
+        return {}
+
+    app.mount("/files", MediaFiles(directory=tmp_path), name="files")
+    return TestClient(app)
+
+
+def test_requests_are_labelled_by_route_template(tmp_path):
+    client = make_client(tmp_path)
+    ok, missing = count("/things/{thing_id}", 200), count("/things/{thing_id}", 404)
+
+    client.get("/things/1")
+    client.get("/things/2")
+    client.get("/things/0")
+
+    assert count("/things/{thing_id}", 200) == ok + 2
+    assert count("/things/{thing_id}", 404) == missing + 1
+    assert count("/things/1", 200) == 0
+
+
+def test_mounts_and_unmatched_paths_share_one_series(tmp_path):
+    client = make_client(tmp_path)
+    files, unmatched = count("/files/{path}", 200), count("<unmatched>", 404)
+
+    client.get("/files/a.png")
+    client.get("/nowhere/1")
+    client.get("/nowhere/2")
+
+    assert count("/files/{path}", 200) == files + 1
+    assert count("<unmatched>", 404) == unmatched + 2
+
+
+def test_health_is_not_recorded(tmp_path):
+    client = make_client(tmp_path)
+
+    client.get("/health")
+
+    assert count("/health", 200) == 0
+
+
+def test_dependency_timings_are_recorded_per_route(tmp_path):
+    client = make_client(tmp_path)
+    labels = {"dependency": "elasticsearch", "endpoint": "/slow"}
+    before = REGISTRY.get_sample_value("http_request_dependency_calls_sum", labels) or 0.0
+
+    response = client.get("/slow")
+
+    assert "server-timing" not in response.headers
+    assert REGISTRY.get_sample_value("http_request_dependency_calls_sum", labels) == before + 2
+    assert REGISTRY.get_sample_value("http_request_dependency_seconds_count", labels) >= 1
+
+
+def test_server_timing_header_in_debug_mode(tmp_path, monkeypatch):
+    monkeypatch.setattr(middleware, "DEBUG", True)
+    client = make_client(tmp_path)
+
+    header = client.get("/slow").headers["server-timing"]
+
+    entries = [entry.split(";")[0] for entry in header.split(", ")]
+    assert entries == ["elasticsearch", "db", "total"]
+    assert 'desc="2 calls"' in header
@@ -0,0 +1,96 @@
+import pytest
+
+from app.nutrition import NUTRIENTS, per_100g_from_items, summarize, to_grams
+
+
+def test_mass_units_convert_directly():
+    assert to_grams(2, "kg", "potato") == 2000
+    assert to_grams(8, "oz", "cheese") == pytest.approx(226.796)
+
+
+def test_volume_units_use_ingredient_density():
+    assert to_grams(1, "cup", "water") == pytest.approx(236.588)
+    assert to_grams(1, "cup", "flour") == pytest.approx(236.588 * 0.53)
+    assert to_grams(1, "Tbsp.", "sunflower oil") == pytest.approx(14.7868 * 0.92)
+
+
+def test_units_without_fixed_weight_are_unknown():
+    assert to_grams(2, "piece", "egg") is None
+    assert to_grams(1, "pinch", "salt") is None
+
+
+def test_per_100g_from_items_normalises_serving_size():
+    per_100g = per_100g_from_items([{"serving_size_g": 50, "sugar_g": 5, "sodium_mg": "Only for premium"}])
+
+    assert per_100g["sugar_g"] == 10
+    assert per_100g["sodium_mg"] == 0
+    assert set(per_100g) == set(NUTRIENTS)
+
+
+def test_summarize_derives_per_100g_and_per_serving():
+    summary = summarize({"sugar_g": 20.0}, 400.0, 4)
+
+    assert summary["per_100g"] == {"sugar_g": 5.0}
+    assert summary["per_serving"] == {"sugar_g": 5.0}
+
+
+def test_aggregate_batch_matches_per_recipe_loop():
+    import numpy as np
+
+    from app.nutrition import aggregate_batch, aggregate_items, nutrient_vector
+
+    query_items = [
+        [{"serving_size_g": 100, "sugar_g": 10, "fat_total_g": 1}],
+        [{"serving_size_g": 50, "sodium_mg": "n/a"}, {"serving_size_g": 25, "fiber_g": 3}],
+        [],
+    ]
+    recipes = [([0, 1], 2), ([], 4), ([2], 1), ([1, 1, 0], 0)]
+
+    query_vectors = np.array([nutrient_vector(items) for items in query_items])
+    ingredient_queries = np.array([q for queries, _ in recipes for q in queries], dtype=np.intp)
+    offsets = np.cumsum([0] + [len(queries) for queries, _ in recipes])
+    servings = np.array([s for _, s in recipes], dtype=float)
+
+    batch = aggregate_batch(query_vectors, ingredient_queries, offsets, servings)
+
+    for (queries, portions), result in zip(recipes, batch):
+        totals, weight = aggregate_items([item for q in queries for item in query_items[q]])
+        expected = summarize(totals, weight, portions)
+        assert result["total_weight_g"] == pytest.approx(expected["total_weight_g"])
+        assert result["totals"] == pytest.approx(expected["totals"])
+        assert result["per_100g"] == pytest.approx(expected["per_100g"])
+        assert result["per_serving"] == pytest.approx(expected["per_serving"])
+
+
+def test_nutrition_batch_endpoint(monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from app.routers import nutrition as nutrition_router
+
+    requested = []
+
+    async def fake_fetch_nutrition_many(queries):
+        requested.append(queries)
+        return [[{"serving_size_g": 100, "sugar_g": 4}] for _ in queries]
+
+    monkeypatch.setattr(nutrition_router, "fetch_nutrition_many", fake_fetch_nutrition_many)
+    app = FastAPI()
+    app.include_router(nutrition_router.router)
+    salt = {"name": "salt", "amount": 1, "unit": "g"}
+    sugar = {"name": "sugar", "amount": 2, "unit": "tbsp"}
+
+    response = TestClient(app).post(
+        "/nutrition/batch",
+        json={"recipes": [
+            {"ingredients": [salt, sugar], "servings": 2},
+            {"ingredients": [salt], "servings": 1},
+        ]},
+    )
+
+    assert response.status_code == 200
+    first, second = response.json()["recipes"]
+    assert first["total_weight_g"] == 200
+    assert first["per_serving"]["sugar_g"] == 4
+    assert second["totals"]["sugar_g"] == 4
+    assert requested == [["1 g salt", "2 tbsp sugar"]]
@@ -0,0 +1,155 @@
+import asyncio
+import importlib
+
+import httpx
+import pytest
+import respx
+
+
+def load_nutrition_client(monkeypatch):
+    monkeypatch.setenv("NINJAS_NUTRITION_API_KEY", "test-key")
+    monkeypatch.setenv("NUTRITION_API_TIMEOUT", "3")
+    nutrition_client = importlib.import_module("app.services.nutrition_client")
+    return importlib.reload(nutrition_client)
+
+
+@respx.mock
+@pytest.mark.asyncio
+async def test_fetch_nutrition_reuses_pooled_client(monkeypatch):
+    nutrition_client = load_nutrition_client(monkeypatch)
+    route = respx.get(nutrition_client.API_URL).mock(
+        return_value=httpx.Response(200, json=[{"name": "salt", "serving_size_g": 1}])
+    )
+
+    first = await nutrition_client.fetch_nutrition("1 g salt")
+    client = nutrition_client.http_client.get()
+    second = await nutrition_client.fetch_nutrition("2 g salt")
+
+    assert first == second == [{"name": "salt", "serving_size_g": 1}]
+    assert nutrition_client.http_client.get() is client
+    assert client.timeout.read == 3
+    assert route.call_count == 2
+    assert route.calls[0].request.headers["X-Api-Key"] == "test-key"
+
+    await nutrition_client.http_client.aclose()
+
+
+@respx.mock
+@pytest.mark.asyncio
+async def test_fetch_nutrition_raises_on_error_status(monkeypatch):
+    nutrition_client = load_nutrition_client(monkeypatch)
+    respx.get(nutrition_client.API_URL).mock(return_value=httpx.Response(500))
+
+    with pytest.raises(httpx.HTTPStatusError):
+        await nutrition_client.fetch_nutrition("1 g salt")
+
+    await nutrition_client.http_client.aclose()
+
+
+def _item(name):
+    return {"name": name, "serving_size_g": 100}
+
+
+@respx.mock
+@pytest.mark.asyncio
+async def test_fetch_nutrition_many_batches_and_caches(monkeypatch):
+    nutrition_client = load_nutrition_client(monkeypatch)
+    monkeypatch.setattr(nutrition_client, "NUTRITION_BATCH_SIZE", 2)
+
+    def answer(request):
+        query = request.url.params["query"]
+        return httpx.Response(200, json=[_item(part.split()[-1]) for part in query.split(" and ")])
+
+    route = respx.get(nutrition_client.API_URL).mock(side_effect=answer)
+
+    results = await nutrition_client.fetch_nutrition_many(
+        ["1 g salt", "2 cup flour", "1  G  Salt", "3 egg"]
+    )
+
+    assert [[i["name"] for i in r] for r in results] == [["salt"], ["flour"], ["salt"], ["egg"]]
+    assert sorted(call.request.url.params["query"] for call in route.calls) == [
+        "1 g salt and 2 cup flour",
+        "3 egg",
+    ]
+
+    again = await nutrition_client.fetch_nutrition_many(["1 g salt", "3 egg"])
+    assert [[i["name"] for i in r] for r in again] == [["salt"], ["egg"]]
+    assert route.call_count == 2
+
+    await nutrition_client.http_client.aclose()
+
+
+@respx.mock
+@pytest.mark.asyncio
+async def test_fetch_nutrition_many_falls_back_when_batch_is_ambiguous(monkeypatch):
+    nutrition_client = load_nutrition_client(monkeypatch)
+
+    def answer(request):
+        query = request.url.params["query"]
+        if " and " in query:
+            return httpx.Response(200, json=[_item("mystery")])
+        return httpx.Response(200, json=[_item(query.split()[-1])])
+
+    route = respx.get(nutrition_client.API_URL).mock(side_effect=answer)
+
+    results = await nutrition_client.fetch_nutrition_many(["1 g salt", "2 g sugar"])
+
+    assert [[i["name"] for i in r] for r in results] == [["salt"], ["sugar"]]
+    assert route.call_count == 3
+
+    await nutrition_client.http_client.aclose()
+
+
+@respx.mock
+@pytest.mark.asyncio
+async def test_fetch_nutrition_many_matches_items_by_name(monkeypatch):
+    nutrition_client = load_nutrition_client(monkeypatch)
+    # api-ninjas drops unknown foods and splits names containing "and", so
+    # the item count can agree with the query count by accident
+    answers = {
+        "1 g zzqx and 1 g sugar and 1 g salt": [_item("sugar"), _item("salt"), _item("pepper")],
+        "1 g zzqx": [],
+        "1 g sugar": [_item("sugar")],
+        "1 g salt": [_item("salt")],
+        "1 tsp salt and pepper": [_item("salt"), _item("pepper")],
+    }
+    route = respx.get(nutrition_client.API_URL).mock(
+        side_effect=lambda request: httpx.Response(200, json=answers[request.url.params["query"]])
+    )
+
+    results = await nutrition_client.fetch_nutrition_many(
+        ["1 g zzqx", "1 g sugar", "1 g salt", "1 tsp salt and pepper"]
+    )
+
+    assert [[i["name"] for i in r] for r in results] == [[], ["sugar"], ["salt"], ["salt", "pepper"]]
+    # the name with "and" in it is never combined with others
+    assert route.call_count == 5
+
+    await nutrition_client.http_client.aclose()
+
+
+@respx.mock
+@pytest.mark.asyncio
+async def test_fetch_nutrition_many_bounds_concurrency(monkeypatch):
+    nutrition_client = load_nutrition_client(monkeypatch)
+    monkeypatch.setattr(nutrition_client, "NUTRITION_BATCH_SIZE", 1)
+    monkeypatch.setattr(nutrition_client, "_api_slots", asyncio.Semaphore(2))
+    in_flight = 0
+    peak = 0
+
+    async def answer(request):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return httpx.Response(200, json=[_item(request.url.params["query"])])
+
+    respx.get(nutrition_client.API_URL).mock(side_effect=answer)
+
+    results = await nutrition_client.fetch_nutrition_many([f"{i} g salt" for i in range(6)])
+
+    assert len(results) == 6
+    assert peak == 2
+
+    await nutrition_client.http_client.aclose()
@@ -1,11 +1,21 @@
 import importlib
+import io
 import json
 from pathlib import Path
 import sys
 
 import pytest
+from elastic_transport import ApiResponseMeta, HttpHeaders
+from elasticsearch import ConnectionError as ESConnectionError, NotFoundError
 from fastapi import FastAPI
+from sqlalchemy import event
 from fastapi.testclient import TestClient
+from PIL import Image
+
+from app import schemas
+
+
+PNG_BYTES = b"\x89PNG\r\n\x1a\n" + b"image-bytes"
 
 
 class DummyESClient:
@@ -19,6 +29,16 @@ class DummyESClient:
         return None
 
 
+class SearchESClient(DummyESClient):
+    def __init__(self, hits):
+        self.hits = hits
+        self.calls = []
+
+    async def search(self, **kwargs):
+        self.calls.append(kwargs)
+        return {"hits": {"hits": self.hits}}
+
+
 @pytest.fixture()
 def test_client(monkeypatch, tmp_path: Path):
     db_path = tmp_path / "test.db"
@@ -33,32 +53,46 @@ def test_client(monkeypatch, tmp_path: Path):
         "app.database",
         "app.models",
         "app.crud",
+        "app.async_crud",
         "app.elastic",
         "app.utils.auth",
+        "app.utils.storage",
+        "app.utils.images",
+        "app.search",
+        "app.services.recipe_nutrition",
         "app.routers.recipes",
     ]:
         sys.modules.pop(module_name, None)
 
     database = importlib.import_module("app.database")
     models = importlib.import_module("app.models")
+    # refresh the package attribute too, or "from . import storage" in
+    # app.utils.images picks up an earlier test's MEDIA_ROOT
+    importlib.import_module("app.utils.storage")
     importlib.import_module("app.crud")
     recipes = importlib.import_module("app.routers.recipes")
 
     models.Base.metadata.create_all(bind=database.engine)
 
     recipes.client = DummyESClient()
+    recipes.recipe_cache.recipes.clear()
+    recipes.recipe_cache.pages.clear()
 
     async def fake_get_user_id_by_username(username: str) -> int:
         return 1
 
     recipes.get_user_id_by_username = fake_get_user_id_by_username
 
-    def override_get_db():
-        db = database.SessionLocal()
-        try:
+    async def fake_create_derivatives(img: str):
+        recipes.derivatives_requested.append(img)
+
+    recipes.derivatives_requested = []
+
+    recipes.create_derivatives = fake_create_derivatives
+
+    async def override_get_db():
+        async with database.AsyncSessionLocal() as db:
             yield db
-        finally:
-            db.close()
 
     app = FastAPI()
     app.include_router(recipes.router)
@@ -82,7 +116,7 @@ def _create_recipe_payload(name: str = "Test Recipe"):
         "visibility": "public",
         "category": "breakfast",
     }
-    files = {"image": ("photo.png", b"image-bytes", "image/png")}
+    files = {"image": ("photo.png", PNG_BYTES, "image/png")}
     return data, files
 
 
@@ -97,6 +131,22 @@ def test_create_and_get_recipe(test_client):
     fetched = client.get(f"/recipes/{recipe['recipe_id']}")
     assert fetched.status_code == 200
     assert fetched.json()["recipe_name"] == "Test Recipe"
+    assert fetched.json().keys() == schemas.Recipe.model_fields.keys()
+
+
+def test_create_recipe_schedules_image_derivatives(test_client):
+    client, recipes = test_client
+    data, _ = _create_recipe_payload()
+    photo = io.BytesIO()
+    Image.new("RGB", (400, 300)).save(photo, format="PNG")
+    files = {"image": ("photo.png", photo.getvalue(), "image/png")}
+
+    recipe = client.post("/recipes/", data=data, files=files).json()
+
+    assert recipes.derivatives_requested == [recipe["img"]]
+    # the srcset stops at the upload's own width instead of upscaling
+    stem = recipe["img"].rsplit(".", 1)[0]
+    assert recipe["img_srcset"]["webp"] == f"{stem}_320.webp 320w, {stem}_400.webp 400w"
 
 
 def test_list_and_filter_recipes(test_client):
@@ -166,3 +216,522 @@ def test_create_recipe_invalid_ingredients(test_client):
     response = client.post("/recipes/", data=data, files=files)
     assert response.status_code == 400
     assert response.json()["detail"] == "Invalid ingredients format"
+
+
+def _count_queries(client, path, **kwargs):
+    engine = importlib.import_module("app.database").async_engine.sync_engine
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        response = client.get(path, **kwargs)
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    return response, len(statements)
+
+
+def test_get_recipe_returns_304_for_matching_etag(test_client):
+    client, _ = test_client
+    data, files = _create_recipe_payload()
+    recipe_id = client.post("/recipes/", data=data, files=files).json()["recipe_id"]
+
+    first = client.get(f"/recipes/{recipe_id}")
+    etag = first.headers["etag"]
+    assert first.json()["updated_at"]
+
+    cached, queries = _count_queries(client, f"/recipes/{recipe_id}", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["etag"] == etag
+    # only the updated_at check, no recipe load
+    assert queries == 1
+
+    updated = client.put(f"/recipes/{recipe_id}", data={"recipe_name": "Updated"})
+    assert updated.status_code == 200
+
+    changed = client.get(f"/recipes/{recipe_id}", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.json()["recipe_name"] == "Updated"
+    assert changed.headers["etag"] != etag
+
+
+def test_list_recipes_cache_invalidated_by_writes(test_client):
+    client, _ = test_client
+    data, files = _create_recipe_payload(name="First")
+    client.post("/recipes/", data=data, files=files)
+
+    first = client.get("/recipes/")
+    etag = first.headers["etag"]
+    cached, queries = _count_queries(client, "/recipes/", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert queries == 1
+
+    data, files = _create_recipe_payload(name="Second")
+    created = client.post("/recipes/", data=data, files=files).json()
+    listed = client.get("/recipes/", headers={"If-None-Match": etag})
+    assert listed.status_code == 200
+    assert [r["recipe_name"] for r in listed.json()] == ["Second", "First"]
+
+    client.delete(f"/recipes/{created['recipe_id']}")
+    assert [r["recipe_name"] for r in client.get("/recipes/").json()] == ["First"]
+
+
+def _count_list_queries(client):
+    engine = importlib.import_module("app.database").async_engine.sync_engine
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        response = client.get("/recipes/")
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    assert response.status_code == 200
+    return len(response.json()), len(statements)
+
+
+def test_list_recipes_query_count_is_constant(test_client):
+    client, _ = test_client
+    data, files = _create_recipe_payload(name="Only")
+    client.post("/recipes/", data=data, files=files)
+    listed, small_page = _count_list_queries(client)
+    assert listed == 1
+
+    for i in range(5):
+        data, files = _create_recipe_payload(name=f"Recipe {i}")
+        data["ingredients"] = json.dumps(
+            [{"name": f"ingredient-{i}-{j}", "amount": 1, "unit": "g"} for j in range(3)]
+        )
+        client.post("/recipes/", data=data, files=files)
+    listed, large_page = _count_list_queries(client)
+    assert listed == 6
+
+    assert large_page == small_page
+
+
+def test_cursor_pagination_walks_every_recipe_once(test_client):
+    client, recipes = test_client
+    for i in range(5):
+        data, files = _create_recipe_payload(name=f"Recipe {i}")
+        client.post("/recipes/", data=data, files=files)
+
+    seen = []
+    params = {"limit": 2}
+    for _ in range(10):
+        page = client.get("/recipes/", params=params)
+        assert page.status_code == 200
+        seen.extend(r["recipe_id"] for r in page.json())
+        next_cursor = page.headers.get(recipes.NEXT_CURSOR_HEADER)
+        if not next_cursor:
+            break
+        params = {"limit": 2, "cursor": next_cursor}
+    else:
+        pytest.fail("cursor pagination did not terminate")
+
+    assert len(seen) == 5
+    assert seen == sorted(seen, reverse=True)
+
+    first = client.get("/recipes/user/1", params={"limit": 3})
+    rest = client.get(
+        "/recipes/user/1",
+        params={"limit": 3, "cursor": first.headers[recipes.NEXT_CURSOR_HEADER]},
+    )
+    assert [r["recipe_id"] for r in first.json() + rest.json()] == seen
+    assert recipes.NEXT_CURSOR_HEADER not in rest.headers
+
+
+def test_skip_still_supported(test_client):
+    client, _ = test_client
+    for i in range(3):
+        data, files = _create_recipe_payload(name=f"Recipe {i}")
+        client.post("/recipes/", data=data, files=files)
+
+    everything = client.get("/recipes/").json()
+    skipped = client.get("/recipes/", params={"skip": 1, "limit": 1}).json()
+    assert [r["recipe_id"] for r in skipped] == [everything[1]["recipe_id"]]
+
+
+def test_invalid_cursor_rejected(test_client):
+    client, _ = test_client
+    response = client.get("/recipes/", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+
+def test_skip_with_cursor_rejected(test_client):
+    client, recipes = test_client
+    for i in range(3):
+        data, files = _create_recipe_payload(name=f"Recipe {i}")
+        client.post("/recipes/", data=data, files=files)
+
+    first = client.get("/recipes/", params={"limit": 1})
+    cursor = first.headers[recipes.NEXT_CURSOR_HEADER]
+    response = client.get("/recipes/", params={"limit": 1, "cursor": cursor, "skip": 1})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "skip cannot be combined with cursor"
+
+
+def _count_create_queries(client, ingredients):
+    engine = importlib.import_module("app.database").async_engine.sync_engine
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    data, files = _create_recipe_payload()
+    data["ingredients"] = json.dumps(ingredients)
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        response = client.post("/recipes/", data=data, files=files)
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    assert response.status_code == 201
+    return response.json(), len(statements)
+
+
+def test_create_recipe_query_count_is_constant(test_client):
+    client, _ = test_client
+    _, one = _count_create_queries(client, [{"name": "salt", "amount": 1, "unit": "g"}])
+    created, twenty = _count_create_queries(
+        client,
+        [{"name": f"ingredient-{i}", "amount": i, "unit": "g"} for i in range(20)],
+    )
+
+    assert len(created["ingredients"]) == 20
+    assert twenty == one
+
+
+def test_create_recipe_reuses_existing_ingredients(test_client):
+    client, _ = test_client
+    ingredients = [
+        {"name": "flour", "amount": 1, "unit": "cup"},
+        {"name": "sugar", "amount": 2, "unit": "tbsp"},
+        {"name": "flour", "amount": 0.5, "unit": "cup"},
+    ]
+    data, files = _create_recipe_payload()
+    client.post("/recipes/", data=data, files=files)
+    data["ingredients"] = json.dumps(ingredients)
+    created = client.post("/recipes/", data=data, files=files).json()
+
+    assert [(i["name"], i["amount"]) for i in created["ingredients"]] == [
+        ("flour", 1), ("sugar", 2), ("flour", 0.5)
+    ]
+    models = importlib.import_module("app.models")
+    db = importlib.import_module("app.database").SessionLocal()
+    try:
+        assert db.query(models.Ingredient).count() == 2
+    finally:
+        db.close()
+
+
+def test_search_hydrates_hits_in_ranked_order(test_client):
+    client, recipes = test_client
+    created = []
+    for name in ["First", "Second", "Third"]:
+        data, files = _create_recipe_payload(name=name)
+        created.append(client.post("/recipes/", data=data, files=files).json())
+    data, files = _create_recipe_payload(name="Hidden")
+    data["visibility"] = "private"
+    hidden = client.post("/recipes/", data=data, files=files).json()
+
+    ranked = [created[2], hidden, created[0]]
+    recipes.client = SearchESClient(
+        [{"_id": str(r["recipe_id"]), "sort": [1.0, r["recipe_id"]]} for r in ranked] + [
+            {"_id": "9999", "sort": [0.5, 9999]}
+        ]
+    )
+
+    response = client.get("/recipes/search", params={"q": "recipe", "limit": 4})
+    assert response.status_code == 200
+    assert [r["recipe_name"] for r in response.json()] == ["Third", "First"]
+    assert recipes.NEXT_CURSOR_HEADER in response.headers
+
+    call = recipes.client.calls[0]
+    assert call["size"] == 4
+    assert call["search_after"] is None
+
+    follow = client.get(
+        "/recipes/search",
+        params={"q": "recipe", "limit": 4, "cursor": response.headers[recipes.NEXT_CURSOR_HEADER]},
+    )
+    assert follow.status_code == 200
+    assert recipes.client.calls[1]["search_after"] == [0.5, 9999]
+
+
+class FailingESClient(DummyESClient):
+    def __init__(self, exc):
+        self.exc = exc
+
+    async def search(self, **kwargs):
+        raise self.exc
+
+
+def test_search_reports_elasticsearch_failures(test_client):
+    client, recipes = test_client
+    meta = ApiResponseMeta(404, "1.1", HttpHeaders(), 0.01, None)
+
+    recipes.client = FailingESClient(ESConnectionError("connection refused"))
+    unreachable = client.get("/recipes/search", params={"q": "soup"})
+    assert unreachable.status_code == 503
+    assert unreachable.json()["detail"] == "Search is unavailable"
+
+    recipes.client = FailingESClient(NotFoundError("index_not_found_exception", meta, {}))
+    failed = client.get("/recipes/search", params={"q": "soup"})
+    assert failed.status_code == 502
+    assert failed.json()["detail"] == "Search failed: index_not_found_exception"
+
+
+def test_recipe_nutrition_is_computed_once_then_read_from_db(test_client, monkeypatch):
+    client, _ = test_client
+    recipe_nutrition = importlib.import_module("app.services.recipe_nutrition")
+    queries = []
+
+    async def fake_fetch_nutrition_many(batch):
+        queries.extend(batch)
+        return [
+            [{"serving_size_g": 100, "sugar_g": 10, "sodium_mg": 200}] if q.startswith("100g") else
+            [{"serving_size_g": 50}]
+            for q in batch
+        ]
+
+    monkeypatch.setattr(recipe_nutrition, "fetch_nutrition_many", fake_fetch_nutrition_many)
+    data, files = _create_recipe_payload()
+    data["ingredients"] = json.dumps([
+        {"name": "sugar", "amount": 200, "unit": "g"},
+        {"name": "egg", "amount": 2, "unit": "piece"},
+    ])
+    created = client.post("/recipes/", data=data, files=files).json()
+
+    first = client.get(f"/recipes/{created['recipe_id']}/nutrition")
+    assert first.status_code == 200
+    summary = first.json()
+    assert summary["total_weight_g"] == 250
+    assert summary["totals"]["sugar_g"] == pytest.approx(25)
+    assert summary["per_serving"]["sodium_mg"] == pytest.approx(250)
+    assert sorted(queries) == ["100g egg", "100g sugar", "2 piece egg"]
+
+    queries.clear()
+    second = client.get(f"/recipes/{created['recipe_id']}/nutrition")
+    assert second.json() == summary
+    assert queries == []
+
+
+def test_recipe_nutrition_missing_recipe(test_client):
+    client, _ = test_client
+    assert client.get("/recipes/999/nutrition").status_code == 404
+
+
+def test_create_recipe_rejects_non_image_upload(test_client):
+    client, _ = test_client
+    data, _ = _create_recipe_payload()
+    files = {"image": ("photo.png", b"<script>alert(1)</script>", "image/png")}
+
+    response = client.post("/recipes/", data=data, files=files)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Unsupported image type"
+
+
+def test_batch_keeps_requested_order_and_reports_missing(test_client):
+    client, _ = test_client
+    ids = []
+    for name in ["A", "B", "C"]:
+        data, files = _create_recipe_payload(name=name)
+        ids.append(client.post("/recipes/", data=data, files=files).json()["recipe_id"])
+    client.get(f"/recipes/{ids[0]}")
+
+    response, queries = _count_queries(client, f"/recipes/batch?ids={ids[2]},999,{ids[0]},{ids[1]},{ids[2]}")
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [r["recipe_name"] for r in body["recipes"]] == ["C", "A", "B"]
+    assert body["missing"] == [999]
+    assert body["recipes"][1] == client.get(f"/recipes/{ids[0]}").json()
+    # updated_at of the cached id, then recipes and ingredients for the rest
+    assert queries == 3
+
+
+def test_cached_recipe_made_private_by_another_worker_is_not_served(test_client):
+    client, recipes = test_client
+    data, files = _create_recipe_payload(name="Shared")
+    recipe_id = client.post("/recipes/", data=data, files=files).json()["recipe_id"]
+    client.app.dependency_overrides[recipes.get_optional_user_id] = lambda: None
+    assert client.get(f"/recipes/{recipe_id}").status_code == 200
+    assert len(client.get("/recipes/").json()) == 1
+
+    # another worker's write, which does not touch this process's cache
+    database = importlib.import_module("app.database")
+    models = importlib.import_module("app.models")
+    with database.SessionLocal() as db:
+        db.get(models.Recipe, recipe_id).visibility = models.VisibilityEnum.PRIVATE
+        db.commit()
+
+    assert client.get(f"/recipes/{recipe_id}").status_code == 404
+    assert client.get(f"/recipes/batch?ids={recipe_id}").json()["missing"] == [recipe_id]
+    assert client.get("/recipes/").json() == []
+
+    with database.SessionLocal() as db:
+        db.delete(db.get(models.Recipe, recipe_id))
+        db.commit()
+
+    client.app.dependency_overrides[recipes.get_optional_user_id] = lambda: 1
+    assert client.get(f"/recipes/{recipe_id}").status_code == 404
+
+
+@pytest.mark.parametrize("ids", ["", "1,x", ",".join(str(i) for i in range(1, 102))])
+def test_batch_rejects_bad_ids(test_client, ids):
+    client, _ = test_client
+
+    response = client.get(f"/recipes/batch?ids={ids}")
+
+    assert response.status_code == 400
+
+
+def test_private_recipes_only_visible_to_their_owner(test_client):
+    client, recipes = test_client
+    data, files = _create_recipe_payload(name="Public")
+    public_id = client.post("/recipes/", data=data, files=files).json()["recipe_id"]
+    data, files = _create_recipe_payload(name="Private")
+    data["visibility"] = "private"
+    private_id = client.post("/recipes/", data=data, files=files).json()["recipe_id"]
+    data, files = _create_recipe_payload(name="Followers")
+    data["visibility"] = "followers_only"
+    client.post("/recipes/", data=data, files=files)
+
+    # anonymous
+    assert [r["recipe_name"] for r in client.get("/recipes/").json()] == ["Public"]
+    assert [r["recipe_name"] for r in client.get("/recipes/user/1").json()] == ["Public"]
+    assert client.get(f"/recipes/{private_id}").status_code == 404
+    assert client.get(f"/recipes/batch?ids={private_id},{public_id}").json()["missing"] == [private_id]
+    assert client.get(f"/recipes/{private_id}/nutrition").status_code == 404
+
+    # another user
+    client.app.dependency_overrides[recipes.get_optional_user_id] = lambda: 2
+    assert [r["recipe_name"] for r in client.get("/recipes/").json()] == ["Public"]
+    assert client.get(f"/recipes/{private_id}").status_code == 404
+    assert client.get(f"/recipes/{private_id}/nutrition").status_code == 404
+
+    # the owner
+    client.app.dependency_overrides[recipes.get_optional_user_id] = lambda: 1
+    assert [r["recipe_name"] for r in client.get("/recipes/").json()] == ["Followers", "Private", "Public"]
+    assert len(client.get("/recipes/user/1").json()) == 3
+    assert client.get(f"/recipes/{private_id}").json()["recipe_name"] == "Private"
+
+
+def _create_filterable(client, name, category, total_time, ingredients, keywords):
+    data, files = _create_recipe_payload(name=name)
+    data["category"] = category
+    data["total_time"] = total_time
+    data["keywords"] = keywords
+    data["ingredients"] = json.dumps([{"name": n, "amount": 1, "unit": "g"} for n in ingredients])
+    assert client.post("/recipes/", data=data, files=files).status_code == 201
+
+
+def test_list_recipes_filters(test_client):
+    client, _ = test_client
+    _create_filterable(client, "Pancakes", "breakfast", "00:20:00", ["Flour", "egg", "milk"], "quick,sweet")
+    _create_filterable(client, "Omelette", "breakfast", "00:10:00", ["egg", "cheese"], "quick")
+    _create_filterable(client, "Stew", "dinner", "02:00:00", ["beef", "carrot"], "slow_cooked")
+
+    def names(params):
+        response = client.get("/recipes/", params=params)
+        assert response.status_code == 200
+        return [r["recipe_name"] for r in response.json()]
+
+    assert names({"category": "breakfast"}) == ["Omelette", "Pancakes"]
+    assert names({"max_total_time": "00:30:00"}) == ["Omelette", "Pancakes"]
+    assert names({"max_cooking_time": "00:05:00"}) == []
+    assert names({"ingredient": ["EGG"]}) == ["Omelette", "Pancakes"]
+    assert names({"ingredient": ["egg", "flour"]}) == ["Pancakes"]
+    assert names({"ingredient": ["egg"], "exclude_ingredient": ["milk"]}) == ["Omelette"]
+    assert names({"keyword": "SWEET"}) == ["Pancakes"]
+    assert names({"keyword": "_"}) == ["Stew"]
+    assert names({"category": "dinner", "keyword": "quick"}) == []
+
+
+def test_list_recipes_filters_are_cached_separately(test_client):
+    client, _ = test_client
+    _create_filterable(client, "Pancakes", "breakfast", "00:20:00", ["egg"], "quick")
+    _create_filterable(client, "Stew", "dinner", "02:00:00", ["beef"], "slow")
+
+    assert len(client.get("/recipes/").json()) == 2
+    assert [r["recipe_name"] for r in client.get("/recipes/?category=dinner").json()] == ["Stew"]
+
+
+def _import_row(name, **overrides):
+    row = {
+        "recipe_name": name,
+        "cooking_time": "00:10:00",
+        "total_time": "00:20:00",
+        "servings": 2,
+        "ingredients": [{"name": "flour", "amount": 1, "unit": "cup"}, {"name": f"{name} spice", "amount": 2, "unit": "g"}],
+        "instructions": "mix",
+        "img": "/media/" + "a" * 64 + ".png",
+        "category": "dinner",
+    }
+    row.update(overrides)
+    return json.dumps(row)
+
+
+def test_import_recipes_streams_ndjson_in_batches(test_client, monkeypatch):
+    client, recipes = test_client
+    monkeypatch.setattr(recipes, "IMPORT_BATCH_SIZE", 2)
+    lines = [
+        _import_row("One"),
+        _import_row("Two", visibility="private"),
+        "",
+        "{not json",
+        _import_row("Three", servings="many"),
+        _import_row("Four"),
+        _import_row("Five"),
+    ]
+
+    def body():
+        for line in lines:
+            yield (line + "\n").encode()
+
+    response = client.post("/recipes/import", content=body(), headers={"Content-Type": "application/x-ndjson"})
+
+    assert response.status_code == 200
+    report = response.json()
+    assert report["imported"] == 4
+    assert report["failed"] == 2
+    assert [e["line"] for e in report["errors"]] == [4, 5]
+    assert "servings" in report["errors"][1]["error"]
+
+    client.app.dependency_overrides[recipes.get_optional_user_id] = lambda: 1
+    listed = client.get("/recipes/").json()
+    assert sorted(r["recipe_name"] for r in listed) == ["Five", "Four", "One", "Two"]
+    two = next(r for r in listed if r["recipe_name"] == "Two")
+    assert two["visibility"] == "private"
+    assert [i["name"] for i in two["ingredients"]] == ["flour", "Two spice"]
+
+    database = importlib.import_module("app.database")
+    models = importlib.import_module("app.models")
+    with database.SessionLocal() as db:
+        assert db.query(models.SearchOutbox).count() == 4
+        assert db.query(models.Ingredient).filter(models.Ingredient.name == "flour").count() == 1
+
+
+def test_import_recipes_reports_a_failed_batch(test_client, monkeypatch):
+    client, recipes = test_client
+
+    async def broken_import(db, batch, user_id):
+        raise RuntimeError("database is down")
+
+    monkeypatch.setattr(recipes.crud, "import_recipes", broken_import)
+
+    response = client.post("/recipes/import", content=_import_row("One") + "\n" + _import_row("Two"))
+
+    assert response.json() == {
+        "imported": 0,
+        "failed": 2,
+        "errors": [
+            {"line": 1, "error": "Batch failed: RuntimeError"},
+            {"line": 2, "error": "Batch failed: RuntimeError"},
+        ],
+    }
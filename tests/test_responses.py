@@ -0,0 +1,41 @@
+import json
+from datetime import datetime, time, timezone
+
+from app import schemas
+from app.utils import responses
+
+RECIPE = {
+    "recipe_id": 1,
+    "recipe_name": "Žganci",
+    "description": None,
+    "cooking_time": time(0, 10),
+    "total_time": time(0, 20),
+    "servings": 2,
+    "instructions": "mix",
+    "keywords": None,
+    "img": "/media/x.png",
+    "img_srcset": {},
+    "visibility": schemas.VisibilityEnum.PUBLIC,
+    "category": schemas.CategoryEnum.DINNER,
+    "created_at": datetime(2024, 1, 2, 3, 4, 5, 6, tzinfo=timezone.utc),
+    "updated_at": datetime(2024, 1, 2, 3, 4, 5),
+    "user_id": 7,
+    "ingredients": [{"name": "flour", "amount": 1.5, "unit": "cup"}],
+}
+
+
+def test_dumps_stdlib_fallback_matches_orjson(monkeypatch):
+    fast = responses.dumps([RECIPE])
+    monkeypatch.setattr(responses, "orjson", None)
+    slow = responses.dumps([RECIPE])
+
+    assert json.loads(fast) == json.loads(slow)
+    assert json.loads(slow)[0]["created_at"] == "2024-01-02T03:04:05.000006+00:00"
+    assert json.loads(slow)[0]["visibility"] == "public"
+
+
+def test_dumps_output_validates_against_schema():
+    parsed = schemas.Recipe.model_validate_json(responses.dumps(RECIPE))
+
+    assert parsed.model_dump().keys() == RECIPE.keys()
+    assert parsed.cooking_time == time(0, 10)
@@ -0,0 +1,54 @@
+import importlib
+
+import pytest
+
+
+@pytest.fixture()
+def search(monkeypatch):
+    monkeypatch.setenv("ELASTICSEARCH_PASSWORD", "test-secret")
+    return importlib.import_module("app.search")
+
+
+def _visibility_clause(query):
+    return query["bool"]["filter"][0]["bool"]["should"]
+
+
+def test_anonymous_search_only_sees_public(search):
+    query, sort = search.build_search()
+
+    assert _visibility_clause(query) == [{"term": {"visibility": "public"}}]
+    assert "must" not in query["bool"]
+    assert sort == [{"created_at": "desc"}, {"recipe_id": "desc"}]
+
+
+def test_authenticated_search_also_sees_own_recipes(search):
+    query, _ = search.build_search(viewer_id=7)
+
+    assert {"term": {"user_id": 7}} in _visibility_clause(query)
+
+
+def test_text_query_and_filters(search):
+    query, sort = search.build_search(
+        q="pancakes",
+        category="breakfast",
+        max_total_time="00:30:00",
+        include_ingredients=["Flour", "egg"],
+        exclude_ingredients=["Nuts"],
+    )
+
+    assert query["bool"]["must"][0]["multi_match"]["query"] == "pancakes"
+    filters = query["bool"]["filter"]
+    assert {"term": {"category": "breakfast"}} in filters
+    assert {"range": {"total_time": {"lte": "00:30:00"}}} in filters
+    assert {"term": {"ingredients.raw": "flour"}} in filters
+    assert {"term": {"ingredients.raw": "egg"}} in filters
+    assert query["bool"]["must_not"] == [{"terms": {"ingredients.raw": ["nuts"]}}]
+    assert sort[0] == {"_score": "desc"}
+
+
+def test_mapping_covers_every_document_field(search):
+    document_fields = {
+        "recipe_name", "recipe_id", "user_id", "description", "ingredients",
+        "cooking_time", "total_time", "keywords", "category", "visibility", "created_at",
+    }
+    assert set(search.RECIPES_MAPPINGS["properties"]) == document_fields
@@ -3,7 +3,9 @@ from io import BytesIO
 from pathlib import Path
 
 import pytest
-from fastapi import UploadFile
+from fastapi import HTTPException, UploadFile
+
+PNG_BYTES = b"\x89PNG\r\n\x1a\n" + b"image-bytes"
 
 
 def load_storage_module(monkeypatch, media_root: Path):
@@ -15,7 +17,7 @@ def load_storage_module(monkeypatch, media_root: Path):
 @pytest.mark.asyncio
 async def test_save_image_creates_file(monkeypatch, tmp_path):
     storage = load_storage_module(monkeypatch, tmp_path)
-    upload = UploadFile(filename="photo.PNG", file=BytesIO(b"image-bytes"))
+    upload = UploadFile(filename="photo.PNG", file=BytesIO(PNG_BYTES))
 
     result = await storage.save_image(upload)
 
@@ -24,3 +26,53 @@ async def test_save_image_creates_file(monkeypatch, tmp_path):
     saved_path = tmp_path / filename
     assert saved_path.exists()
     assert saved_path.suffix == ".png"
+    assert saved_path.read_bytes() == PNG_BYTES
+
+
+
+@pytest.mark.asyncio
+async def test_save_image_uses_sniffed_type_not_filename(monkeypatch, tmp_path):
+    storage = load_storage_module(monkeypatch, tmp_path)
+    webp = b"RIFF\x00\x00\x00\x00WEBPVP8 " + b"0" * 32
+    upload = UploadFile(filename="photo.png", file=BytesIO(webp))
+
+    result = await storage.save_image(upload)
+
+    assert result.endswith(".webp")
+
+
+@pytest.mark.asyncio
+async def test_save_image_rejects_unknown_content(monkeypatch, tmp_path):
+    storage = load_storage_module(monkeypatch, tmp_path)
+    upload = UploadFile(filename="photo.jpg", file=BytesIO(b"GIF89a not allowed"))
+
+    with pytest.raises(HTTPException) as exc:
+        await storage.save_image(upload)
+
+    assert exc.value.status_code == 400
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.asyncio
+async def test_save_image_enforces_size_limit_while_streaming(monkeypatch, tmp_path):
+    monkeypatch.setenv("MAX_IMAGE_BYTES", "1000")
+    storage = load_storage_module(monkeypatch, tmp_path)
+    monkeypatch.setattr(storage, "CHUNK_SIZE", 100)
+    upload = UploadFile(filename="big.png", file=BytesIO(PNG_BYTES + b"0" * 5000))
+
+    with pytest.raises(HTTPException) as exc:
+        await storage.save_image(upload)
+
+    assert exc.value.status_code == 413
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.asyncio
+async def test_save_image_stores_identical_content_once(monkeypatch, tmp_path):
+    storage = load_storage_module(monkeypatch, tmp_path)
+
+    first = await storage.save_image(UploadFile(filename="a.png", file=BytesIO(PNG_BYTES)))
+    second = await storage.save_image(UploadFile(filename="b.png", file=BytesIO(PNG_BYTES)))
+
+    assert first == second
+    assert [p.name for p in tmp_path.iterdir()] == [first.replace("/media/", "")]
@@ -0,0 +1,33 @@
+from sqlalchemy import create_engine, text
+
+from app.utils import timing
+
+
+def test_sql_statements_are_timed_inside_a_collection(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'timing.db'}")
+    timing.instrument_engine(engine)
+
+    with engine.connect() as conn:
+        with timing.collect() as timings:
+            conn.execute(text("select 1"))
+            conn.execute(text("select 2"))
+        conn.execute(text("select 3"))
+
+    calls, seconds = timings["db"]
+    assert calls == 2
+    assert seconds > 0
+
+
+def test_record_outside_a_collection_is_ignored():
+    timing.record("db", 1.0)
+
+    with timing.collect() as timings:
+        pass
+
+    assert timings == {}
+
+
+def test_server_timing_format():
+    header = timing.server_timing({"db": [3, 0.0042]}, 0.0098)
+
+    assert header == 'db;dur=4.2;desc="3 calls", total;dur=9.8'
@@ -1,3 +1,4 @@
+import asyncio
 import importlib
 
 import httpx
@@ -68,3 +69,127 @@ async def test_get_user_id_by_username_unavailable(monkeypatch):
 
     assert exc.value.status_code == 502
     assert "user-service unavailable" in exc.value.detail
+
+
+@respx.mock
+@pytest.mark.asyncio
+async def test_get_user_id_by_username_reuses_one_client(monkeypatch):
+    user_client = load_user_client(monkeypatch)
+    created = []
+    real_client = httpx.AsyncClient
+
+    def counting_client(*args, **kwargs):
+        client = real_client(*args, **kwargs)
+        created.append(client)
+        return client
+
+    monkeypatch.setattr(httpx, "AsyncClient", counting_client)
+    route = respx.get(url__regex=r"http://user_service:8000/users/by-username/\w+").mock(
+        return_value=httpx.Response(200, json={"user_id": 5})
+    )
+
+    for username in ["alice", "bob", "carol"]:
+        assert await user_client.get_user_id_by_username(username) == 5
+
+    assert route.call_count == 3
+    assert len(created) == 1
+    assert not created[0].is_closed
+
+    await user_client.http_client.aclose()
+    assert created[0].is_closed
+
+
+
+@respx.mock
+@pytest.mark.asyncio
+async def test_get_user_id_by_username_is_cached(monkeypatch):
+    user_client = load_user_client(monkeypatch)
+    route = respx.get("http://user_service:8000/users/by-username/alice").mock(
+        return_value=httpx.Response(200, json={"user_id": 5})
+    )
+
+    assert await user_client.get_user_id_by_username("alice") == 5
+    assert await user_client.get_user_id_by_username("alice") == 5
+
+    assert route.call_count == 1
+
+
+@respx.mock
+@pytest.mark.asyncio
+async def test_get_user_id_by_username_caches_not_found(monkeypatch):
+    user_client = load_user_client(monkeypatch)
+    route = respx.get("http://user_service:8000/users/by-username/missing").mock(
+        return_value=httpx.Response(404)
+    )
+
+    for _ in range(2):
+        with pytest.raises(HTTPException) as exc:
+            await user_client.get_user_id_by_username("missing")
+        assert exc.value.status_code == 404
+
+    assert route.call_count == 1
+
+
+@respx.mock
+@pytest.mark.asyncio
+async def test_get_user_id_by_username_does_not_cache_failures(monkeypatch):
+    user_client = load_user_client(monkeypatch)
+    route = respx.get("http://user_service:8000/users/by-username/flaky").mock(
+        side_effect=[httpx.Response(500), httpx.Response(200, json={"user_id": 9})]
+    )
+
+    with pytest.raises(HTTPException):
+        await user_client.get_user_id_by_username("flaky")
+    assert await user_client.get_user_id_by_username("flaky") == 9
+    assert route.call_count == 2
+
+
+@respx.mock
+@pytest.mark.asyncio
+async def test_get_user_id_by_username_coalesces_concurrent_lookups(monkeypatch):
+    user_client = load_user_client(monkeypatch)
+    release = asyncio.Event()
+
+    async def slow_response(request):
+        await release.wait()
+        return httpx.Response(200, json={"user_id": 5})
+
+    route = respx.get("http://user_service:8000/users/by-username/alice").mock(side_effect=slow_response)
+
+    lookups = [asyncio.create_task(user_client.get_user_id_by_username("alice")) for _ in range(5)]
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await asyncio.gather(*lookups) == [5] * 5
+    assert route.call_count == 1
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = value
+
+
+@respx.mock
+@pytest.mark.asyncio
+async def test_get_user_id_by_username_with_shared_backend(monkeypatch):
+    user_client = load_user_client(monkeypatch)
+    redis = FakeRedis()
+    monkeypatch.setattr(user_client, "cache_backend", user_client.RedisBackend(redis, prefix="user_id:"))
+    route = respx.get("http://user_service:8000/users/by-username/alice").mock(
+        return_value=httpx.Response(200, json={"user_id": 5})
+    )
+
+    assert await user_client.get_user_id_by_username("alice") == 5
+    assert redis.data == {"user_id:alice": '{"user_id": 5}'}
+
+    # a second replica sharing the same store never calls upstream
+    other_replica = load_user_client(monkeypatch)
+    monkeypatch.setattr(other_replica, "cache_backend", other_replica.RedisBackend(redis, prefix="user_id:"))
+    assert await other_replica.get_user_id_by_username("alice") == 5
+    assert route.call_count == 1